@@ -0,0 +1,124 @@
+# benchmarks/bench_book_parse.py
+
+"""
+Parse-CPU benchmark of ChitaiGorodSitemapSpider.parse: XPath vs single-pass.
+
+- Runs the spider's parse() offline on a recorded-style product page
+  (benchmarks/fixtures/chitai_gorod_product.html, synthetic but with the
+  markup the spider reads plus realistic page chrome) in both
+  extraction modes, and checks they produce the same item.
+- "parse": new HtmlResponse per page, so HTML parsing is included (what a
+  crawl pays); "extract": field extraction only, on an already parsed page.
+
+Run from the repo root:
+    python benchmarks/bench_book_parse.py [--rounds 300] [--output result.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HW2 = os.path.join(ROOT, "hw2")
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+sys.path.insert(0, HW2)
+
+from scrapy.utils.reactor import install_reactor  # noqa: E402
+
+install_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
+
+from scrapy.http import HtmlResponse, Request  # noqa: E402
+from scrapy.utils.test import get_crawler  # noqa: E402
+
+from book_scraper.extraction import extract_book  # noqa: E402
+from book_scraper.spiders.chitai_gorod_sitemap import (  # noqa: E402
+    ChitaiGorodSitemapSpider,
+)
+
+URL = (
+    "https://www.chitai-gorod.ru/product/"
+    "koshka-instrukciya-po-ekspluatacii-v-shemah-i-tablicah-2107075"
+)
+
+
+def make_spider(mode):
+    crawler = get_crawler(ChitaiGorodSitemapSpider, {"LOG_LEVEL": "WARNING"})
+    return ChitaiGorodSitemapSpider.from_crawler(crawler, extraction_mode=mode)
+
+
+def make_response(body):
+    return HtmlResponse(URL, body=body, request=Request(URL), encoding="utf-8")
+
+
+def timed(func, rounds):
+    func()  # warm-up
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = time.perf_counter() - started
+    return {
+        "pages": rounds,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(rounds / elapsed, 1),
+        "ms_per_page": round(elapsed / rounds * 1000, 3),
+    }
+
+
+def main(args):
+    with open(args.fixture, "rb") as f:
+        body = f.read()
+
+    items = {}
+    results = {}
+    for mode in ChitaiGorodSitemapSpider.EXTRACTION_MODES:
+        spider = make_spider(mode)
+        items[mode] = dict(next(spider.parse(make_response(body))))
+
+        parsed = make_response(body)
+        parsed.selector  # parse the HTML once, outside the timed loop
+        if mode == "xpath":
+            extract = lambda: spider.extract_fields_xpath(parsed)  # noqa: E731
+        else:
+            extract = lambda: extract_book(parsed.selector.root)  # noqa: E731
+
+        results[mode] = {
+            "parse": timed(lambda: list(spider.parse(make_response(body))), args.rounds),
+            "extract": timed(extract, args.rounds),
+        }
+
+    same = items["xpath"] == items["structured"]
+    for kind in ("parse", "extract"):
+        results[f"speedup_{kind}"] = round(
+            results["structured"][kind]["pages_per_sec"]
+            / results["xpath"][kind]["pages_per_sec"],
+            2,
+        )
+    output = {
+        "benchmark": "book_parse",
+        "fixture": os.path.relpath(args.fixture, ROOT),
+        "fixture_bytes": len(body),
+        "items_match": same,
+        "results": results,
+    }
+    text = json.dumps(output, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if not same:
+        for key in items["xpath"]:
+            if items["xpath"][key] != items["structured"].get(key):
+                print(f"Field {key} differs between extraction modes", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--fixture", default=os.path.join(FIXTURES, "chitai_gorod_product.html")
+    )
+    parser.add_argument("--rounds", type=int, default=300)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    main(parser.parse_args())
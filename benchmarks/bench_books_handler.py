@@ -0,0 +1,223 @@
+# benchmarks/bench_books_handler.py
+
+"""
+Micro-benchmark of the /search_by_isbn handler (requests/sec, in-process).
+
+Compares the original handler (find_one -> Book(**doc) -> response_model
+validation and serialization) with the current fast path (projection ->
+orjson bytes, optionally served from the warm cache).
+
+Requests are sent straight to the ASGI apps, without a network stack, and
+MongoDB is replaced with an in-memory collection seeded from
+hw2/books_export.jsonl, so only the handler/serialization cost is measured.
+Both apps run behind the same RequestLatencyMiddleware as the service.
+
+Run from the repo root:
+    python benchmarks/bench_books_handler.py [--requests 20000] [--output result.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HW2 = os.path.join(ROOT, "hw2")
+sys.path.insert(0, HW2)
+
+from fastapi import FastAPI, HTTPException, Query  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import fastapi_service_books as service  # noqa: E402
+from book_scraper.isbn import normalize_isbn  # noqa: E402
+from books_cache import TTLCache  # noqa: E402
+from books_metrics import RequestLatencyMiddleware  # noqa: E402
+
+
+def load_books(path):
+    with open(path, encoding="utf-8") as f:
+        books = [json.loads(line) for line in f if line.strip()]
+    for book in books:
+        book["isbn_normalized"] = normalize_isbn(book.get("isbn"))
+    return books
+
+
+class MemoryCollection:
+    """Just enough of the motor collection API for the ISBN handlers."""
+
+    def __init__(self, books):
+        self.by_isbn = {}
+        self.by_key = {}
+        for i, book in enumerate(books):
+            doc = {"_id": i, **book}
+            self.by_isbn.setdefault(doc["isbn"], doc)
+            self.by_key.setdefault(doc["isbn_normalized"], doc)
+
+    def match(self, query):
+        if "$or" not in query:
+            doc = self.by_isbn.get(query.get("isbn"))
+            return [doc] if doc else []
+        keys = query["$or"][0]["isbn_normalized"]["$in"]
+        raw = query["$or"][1]["isbn"]["$in"]
+        docs = [self.by_key[k] for k in keys if k in self.by_key]
+        docs += [self.by_isbn[i] for i in raw if i in self.by_isbn]
+        return docs
+
+    @staticmethod
+    def project(docs, projection):
+        if not projection:
+            return [dict(d) for d in docs]
+        fields = [k for k, v in projection.items() if v]
+        return [{k: d[k] for k in fields if k in d} for d in docs]
+
+    async def find_one(self, query, projection=None):
+        docs = self.project(self.match(query)[:1], projection)
+        return docs[0] if docs else None
+
+    def find(self, query, projection=None):
+        return MemoryCursor(self.project(self.match(query), projection))
+
+
+class MemoryCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs[:length] if length else self.docs
+
+
+def legacy_app(collection):
+    """The handler as it was before the fast path (double Pydantic work)."""
+    app = FastAPI()
+    app.add_middleware(RequestLatencyMiddleware, histogram=service.metrics.requests)
+
+    @app.get("/search_by_isbn", response_model=service.Book)
+    async def get_book_by_isbn(isbn: str = Query(...)):
+        result = await collection.find_one({"isbn": isbn})
+        if not result:
+            raise HTTPException(status_code=404, detail="Not found")
+        result.pop("_id", None)
+        return service.Book(**result)
+
+    return app
+
+
+def bench_serialization(books, rounds):
+    """
+    Serialization only, no framework: Book(**doc) + response_model
+    re-validation + JSON dump vs. one orjson pass over the projected doc.
+    """
+    adapter = TypeAdapter(service.Book)
+    fields = list(service.Book.model_fields)
+    docs = [{k: b[k] for k in fields if k in b} for b in books]
+
+    def legacy(doc):
+        # Handler builds the model, FastAPI validates it again for response_model
+        book = service.Book(**doc)
+        return adapter.dump_json(adapter.validate_python(book))
+
+    results = {}
+    for name, encode in (("legacy", legacy), ("fast", service.dumps)):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for doc in docs:
+                encode(doc)
+        elapsed = time.perf_counter() - started
+        results[name] = {"docs_per_sec": round(rounds * len(docs) / elapsed, 1)}
+    results["fast"]["speedup_vs_legacy"] = round(
+        results["fast"]["docs_per_sec"] / results["legacy"]["docs_per_sec"], 2
+    )
+    return results
+
+
+async def asgi_get(app, path, query_string):
+    """Sends one GET request to an ASGI app and returns (status, body)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+    response = {"status": None, "body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], response["body"]
+
+
+async def run_scenario(app, isbns, requests):
+    # Warm-up (also fills the cache in the cached scenario)
+    for isbn in isbns:
+        await asgi_get(app, "/search_by_isbn", f"isbn={isbn}")
+    started = time.perf_counter()
+    for i in range(requests):
+        status, _ = await asgi_get(
+            app, "/search_by_isbn", f"isbn={isbns[i % len(isbns)]}"
+        )
+        assert status == 200, status
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1),
+    }
+
+
+async def main(args):
+    books = load_books(args.data)
+    collection = MemoryCollection(books)
+    isbns = [b["isbn"] for b in books if b.get("isbn")][: args.distinct]
+
+    service.books_backend = service.MongoBooksBackend(
+        collection, service.BOOK_PROJECTION, service.dumps
+    )
+    results = {"legacy": await run_scenario(legacy_app(collection), isbns, args.requests)}
+
+    service.book_cache = TTLCache(maxsize=0)
+    results["fast_no_cache"] = await run_scenario(service.app, isbns, args.requests)
+
+    service.book_cache = TTLCache(maxsize=len(isbns) + 1, ttl=3600)
+    results["fast_warm_cache"] = await run_scenario(service.app, isbns, args.requests)
+
+    base = results["legacy"]["rps"]
+    for name, result in results.items():
+        result["speedup_vs_legacy"] = round(result["rps"] / base, 2)
+    output = {
+        "benchmark": "books_handler",
+        "distinct_isbns": len(isbns),
+        "asgi": results,
+        "serialization": bench_serialization(books, rounds=20),
+    }
+    text = json.dumps(output, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data", default=os.path.join(HW2, "books_export.jsonl"))
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument(
+        "--distinct", type=int, default=200, help="ISBNs to cycle through"
+    )
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,358 @@
+# benchmarks/bench_books_load.py
+
+"""
+Load test of the books API over HTTP (throughput and latency percentiles).
+
+- Starts fastapi_service_books under uvicorn with the file backend
+  (BOOKS_BACKEND=file) seeded from hw2/books_export.jsonl, so no MongoDB
+  is needed; --url targets an already running server instead.
+- Sends a weighted mix of traffic: "hit" (known ISBN), "miss" (unknown
+  ISBN, 404) and "batch" (POST /search_by_isbn/batch with known and
+  unknown ISBNs) from N keep-alive connections, for each concurrency level.
+- Prints JSON with rps and p50/p95/p99 latency per level and per request
+  kind, plus the git commit, so results can be compared across commits.
+
+Run from the repo root:
+    python benchmarks/bench_books_load.py [--concurrency 1,8,32] [--duration 10]
+        [--mix hit=80,miss=15,batch=5] [--output result.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import quote, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HW2 = os.path.join(ROOT, "hw2")
+sys.path.insert(0, HW2)
+
+from book_scraper.isbn import normalize_isbn  # noqa: E402
+
+EXPECTED_STATUS = {"hit": 200, "miss": 404, "batch": 200}
+
+
+def load_isbns(path):
+    isbns = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                isbn = json.loads(line).get("isbn")
+                if normalize_isbn(isbn):
+                    isbns.append(isbn)
+    return isbns
+
+
+def unknown_isbns(known, count):
+    """Well-formed ISBN-13s that are not in the dataset."""
+    known = {normalize_isbn(isbn) for isbn in known}
+    isbns = []
+    n = 0
+    while len(isbns) < count:
+        isbn = f"979{n:010d}"
+        if isbn not in known:
+            isbns.append(isbn)
+        n += 1
+    return isbns
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, weight = part.split("=")
+        if kind not in EXPECTED_STATUS:
+            raise argparse.ArgumentTypeError(f"Unknown request kind: {kind}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                cwd=ROOT,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+        )
+    except OSError:
+        return None, None
+    return commit or None, dirty
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client (Content-Length responses only)."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=b""):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+        )
+        if body:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode() + b"\r\n" + body)
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        length = 0
+        close = False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                close = True
+        payload = await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))  # ceil
+    return sorted_values[int(rank) - 1]
+
+
+def latency_summary(latencies):
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        **{
+            f"p{p}": round(percentile(values, p) * 1000, 3) if values else None
+            for p in (50, 95, 99)
+        },
+        "max": round(values[-1] * 1000, 3) if values else None,
+    }
+
+
+class Traffic:
+    def __init__(self, known, unknown, mix, batch_size, seed):
+        self.known = known
+        self.unknown = unknown
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+
+    def next_request(self):
+        """Returns (kind, method, path, body)."""
+        kind = self.random.choices(self.kinds, self.weights)[0]
+        if kind == "hit":
+            isbn = self.random.choice(self.known)
+        elif kind == "miss":
+            isbn = self.random.choice(self.unknown)
+        else:
+            # Mostly known ISBNs with some unknown ones, like a real catalogue sync
+            isbns = [
+                self.random.choice(self.unknown if self.random.random() < 0.1 else self.known)
+                for _ in range(self.batch_size)
+            ]
+            body = json.dumps({"isbns": isbns}).encode()
+            return kind, "POST", "/search_by_isbn/batch", body
+        return kind, "GET", f"/search_by_isbn?isbn={quote(isbn)}", b""
+
+
+async def run_level(host, port, traffic, concurrency, duration, warmup):
+    latencies = {kind: [] for kind in traffic.kinds}
+    errors = {}
+    recording = False
+
+    async def worker():
+        connection = HttpConnection(host, port)
+        try:
+            while time.perf_counter() < deadline:
+                kind, method, path, body = traffic.next_request()
+                started = time.perf_counter()
+                try:
+                    status, _ = await connection.request(method, path, body)
+                except (OSError, ConnectionError, asyncio.IncompleteReadError) as e:
+                    connection.close()
+                    status = type(e).__name__
+                elapsed = time.perf_counter() - started
+                if not recording:
+                    continue
+                if status == EXPECTED_STATUS[kind]:
+                    latencies[kind].append(elapsed)
+                else:
+                    key = f"{kind}:{status}"
+                    errors[key] = errors.get(key, 0) + 1
+        finally:
+            connection.close()
+
+    deadline = time.perf_counter() + warmup + duration
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    await asyncio.sleep(warmup)
+    recording = True
+    started = time.perf_counter()
+    await asyncio.gather(*workers)
+    elapsed = time.perf_counter() - started
+
+    ok = sum(len(values) for values in latencies.values())
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests": ok,
+        "errors": errors,
+        "rps": round(ok / elapsed, 1),
+        "latency_ms": latency_summary(
+            [value for values in latencies.values() for value in values]
+        ),
+        "by_kind": {
+            kind: latency_summary(values) for kind, values in latencies.items()
+        },
+    }
+
+
+def start_server(args, port):
+    env = {
+        **os.environ,
+        "BOOKS_BACKEND": "file",
+        "BOOKS_JSONL_PATH": os.path.abspath(args.data),
+        "BOOKS_CACHE_SIZE": str(args.cache_size),
+    }
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "fastapi_service_books:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        cwd=HW2,
+        env=env,
+    )
+
+
+async def wait_ready(host, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        connection = HttpConnection(host, port)
+        try:
+            status, _ = await connection.request("GET", "/ready")
+            if status == 200:
+                return
+        except (OSError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            connection.close()
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server on {host}:{port} not ready after {timeout}s")
+
+
+async def main(args):
+    known = load_isbns(args.data)
+    unknown = unknown_isbns(known, len(known))
+    server = None
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = "127.0.0.1", free_port()
+        server = start_server(args, port)
+    try:
+        await wait_ready(host, port)
+        levels = []
+        for concurrency in args.concurrency:
+            traffic = Traffic(known, unknown, args.mix, args.batch_size, args.seed)
+            result = await run_level(
+                host, port, traffic, concurrency, args.duration, args.warmup
+            )
+            print(
+                f"concurrency={concurrency}: {result['rps']} rps, "
+                f"p99={result['latency_ms']['p99']} ms",
+                file=sys.stderr,
+            )
+            levels.append(result)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    commit, dirty = git_commit()
+    output = {
+        "benchmark": "books_load",
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "config": {
+            "target": args.url or "uvicorn (file backend)",
+            "workers": None if args.url else args.workers,
+            "cache_size": None if args.url else args.cache_size,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "mix": args.mix,
+            "batch_size": args.batch_size,
+            "known_isbns": len(known),
+            "seed": args.seed,
+        },
+        "levels": levels,
+    }
+    text = json.dumps(output, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data", default=os.path.join(HW2, "books_export.jsonl"))
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument(
+        "--concurrency",
+        type=lambda text: [int(c) for c in text.split(",")],
+        default=[1, 8, 32],
+        help="comma-separated connection counts",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="seconds per level"
+    )
+    parser.add_argument(
+        "--warmup", type=float, default=2.0, help="unrecorded seconds per level"
+    )
+    parser.add_argument("--mix", type=parse_mix, default="hit=80,miss=15,batch=5")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument(
+        "--cache-size", type=int, default=10000, help="BOOKS_CACHE_SIZE, 0 disables"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    asyncio.run(main(parser.parse_args()))
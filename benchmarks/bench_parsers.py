@@ -0,0 +1,352 @@
+# benchmarks/bench_parsers.py
+
+"""
+Parse-CPU benchmark and golden check of all three projects' page callbacks.
+
+- Runs MerchantsSpider.parse_org, ChitaiGorodSitemapSpider.parse (both
+  extraction modes) and NewsSpider.parse_article offline on recorded-style
+  pages in benchmarks/fixtures/ (synthetic, but with the markup each
+  spider reads plus realistic page chrome).
+- pages/sec: new HtmlResponse per page, so HTML parsing is included.
+- Per-field time: every outermost Selector/SelectorList .xpath()/.css()
+  call made by the callback is timed and charged to the item field whose
+  assignment it belongs to (queries before an assignment, e.g. the merchant
+  table loop, count towards the next field assigned). "html_parse" is the
+  lxml parse the first query triggers. The single-pass structured mode
+  makes no selector queries, so only its total is reported.
+- Peak memory: tracemalloc peak of one page (Python allocations only, not
+  libxml2's tree) and the process max RSS after each case.
+- Items are compared with benchmarks/fixtures/golden/<case>.json; any
+  difference exits with status 1 (--write-golden regenerates the files
+  after an intended change).
+
+Run from the repo root:
+    python benchmarks/bench_parsers.py [--rounds 200] [--case kp_article]
+        [--output result.json]
+"""
+
+import argparse
+import ast
+import inspect
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import textwrap
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+GOLDEN = os.path.join(FIXTURES, "golden")
+for project in ("hw1", "hw2", "project"):
+    sys.path.insert(0, os.path.join(ROOT, project))
+
+from scrapy.utils.reactor import install_reactor  # noqa: E402
+
+install_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
+
+import parsel  # noqa: E402
+from scrapy.http import HtmlResponse, Request  # noqa: E402
+from scrapy.utils.test import get_crawler  # noqa: E402
+
+from book_scraper.spiders.chitai_gorod_sitemap import (  # noqa: E402
+    ChitaiGorodSitemapSpider,
+)
+from merchant_scraper.spiders.merchants_spider import MerchantsSpider  # noqa: E402
+from news_scraper.spiders.news_spider import NewsSpider  # noqa: E402
+
+# name -> (spider class, callback, fixture, url, spider kwargs, golden,
+#          functions whose item[...] assignments define the fields)
+CASES = {
+    "merchantpoint_brand": (
+        MerchantsSpider,
+        "parse_org",
+        "merchantpoint_brand.html",
+        "https://merchantpoint.ru/brand/5ka",
+        {},
+        "merchantpoint_brand",
+        [MerchantsSpider.parse_org],
+    ),
+    "chitai_gorod_xpath": (
+        ChitaiGorodSitemapSpider,
+        "parse",
+        "chitai_gorod_product.html",
+        "https://www.chitai-gorod.ru/product/"
+        "koshka-instrukciya-po-ekspluatacii-v-shemah-i-tablicah-2107075",
+        {"extraction_mode": "xpath"},
+        "chitai_gorod_product",
+        [ChitaiGorodSitemapSpider.extract_fields_xpath, ChitaiGorodSitemapSpider.parse],
+    ),
+    "chitai_gorod_structured": (
+        ChitaiGorodSitemapSpider,
+        "parse",
+        "chitai_gorod_product.html",
+        "https://www.chitai-gorod.ru/product/"
+        "koshka-instrukciya-po-ekspluatacii-v-shemah-i-tablicah-2107075",
+        {"extraction_mode": "structured"},
+        "chitai_gorod_product",
+        [ChitaiGorodSitemapSpider.parse],
+    ),
+    "kp_article": (
+        NewsSpider,
+        "parse_article",
+        "kp_article.html",
+        "https://www.kp.ru/online/news/6512345/",
+        {},
+        "kp_article",
+        [NewsSpider.parse_article],
+    ),
+}
+
+
+def field_spans(functions):
+    """{code object: [(last line, field)]} of the item["field"] = ... assignments."""
+    spans = {}
+    for func in functions:
+        lines, first = inspect.getsourcelines(func)
+        tree = ast.parse(textwrap.dedent("".join(lines)))
+        assigned = []
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+                continue
+            target = node.targets[0]
+            if (
+                isinstance(target, ast.Subscript)
+                and isinstance(target.value, ast.Name)
+                and target.value.id == "item"
+                and isinstance(target.slice, ast.Constant)
+            ):
+                assigned.append((node.end_lineno + first - 1, target.slice.value))
+        spans[func.__code__] = sorted(assigned)
+    return spans
+
+
+class QueryTimer:
+    """Times outermost selector queries and charges them to item fields."""
+
+    METHODS = [
+        (parsel.Selector, "xpath"),
+        (parsel.Selector, "css"),
+        (parsel.SelectorList, "xpath"),
+        (parsel.SelectorList, "css"),
+    ]
+
+    def __init__(self, spans):
+        self.spans = spans
+        self.totals = {}
+        self.depth = 0
+        self.originals = []
+
+    def field_for(self, frame):
+        while frame is not None:
+            assigned = self.spans.get(frame.f_code)
+            if assigned is not None:
+                for last_line, field in assigned:
+                    if frame.f_lineno <= last_line:
+                        return field
+                return "other"
+            frame = frame.f_back
+        return "other"
+
+    def wrap(self, method):
+        timer = self
+
+        def timed_query(*args, **kwargs):
+            if timer.depth:
+                return method(*args, **kwargs)
+            timer.depth += 1
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                timer.depth -= 1
+                field = timer.field_for(sys._getframe(1))
+                timer.totals[field] = timer.totals.get(field, 0.0) + elapsed
+
+        return timed_query
+
+    def __enter__(self):
+        for cls, name in self.METHODS:
+            original = cls.__dict__[name]
+            self.originals.append((cls, name, original))
+            setattr(cls, name, self.wrap(original))
+        return self
+
+    def __exit__(self, *exc):
+        for cls, name, original in reversed(self.originals):
+            setattr(cls, name, original)
+        self.originals = []
+
+
+def make_response(url, body):
+    return HtmlResponse(url, body=body, request=Request(url), encoding="utf-8")
+
+
+def run_callback(spider, callback, url, body):
+    return list(getattr(spider, callback)(make_response(url, body)))
+
+
+def measure_throughput(spider, callback, url, body, rounds):
+    run_callback(spider, callback, url, body)  # warm-up
+    started = time.perf_counter()
+    for _ in range(rounds):
+        run_callback(spider, callback, url, body)
+    elapsed = time.perf_counter() - started
+    return {
+        "pages": rounds,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(rounds / elapsed, 1),
+        "ms_per_page": round(elapsed / rounds * 1000, 3),
+    }
+
+
+def measure_fields(spider, callback, url, body, functions, rounds):
+    totals = {"html_parse": 0.0}
+    spent = 0.0
+    with QueryTimer(field_spans(functions)) as timer:
+        for _ in range(rounds):
+            response = make_response(url, body)
+            started = time.perf_counter()
+            response.selector  # noqa: B018 (lazy lxml parse, timed on its own)
+            parsed = time.perf_counter()
+            list(getattr(spider, callback)(response))
+            totals["html_parse"] += parsed - started
+            spent += time.perf_counter() - started
+    for field, seconds in timer.totals.items():
+        totals[field] = totals.get(field, 0.0) + seconds
+    queries = sum(timer.totals.values())
+    # Callback time outside selector queries (all of it for single-pass extraction)
+    rest = "unattributed" if queries else "extraction"
+    totals[rest] = spent - totals["html_parse"] - queries
+    return {
+        field: round(seconds / rounds * 1000, 4)
+        for field, seconds in sorted(totals.items(), key=lambda kv: -kv[1])
+    }
+
+
+def measure_memory(spider, callback, url, body):
+    tracemalloc.start()
+    try:
+        run_callback(spider, callback, url, body)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "python_peak_kb": round(peak / 1024, 1),
+        "process_maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def compare_golden(name, items):
+    path = os.path.join(GOLDEN, name + ".json")
+    with open(path, encoding="utf-8") as f:
+        expected = json.load(f)
+    if len(items) != 1:
+        return [f"expected 1 item, got {len(items)}"]
+    actual = dict(items[0])
+    return [
+        f"{field}: expected {expected.get(field)!r}, got {actual.get(field)!r}"
+        for field in sorted(set(expected) | set(actual))
+        if expected.get(field) != actual.get(field)
+    ]
+
+
+def write_golden(name, items):
+    path = os.path.join(GOLDEN, name + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(dict(items[0]), ensure_ascii=False, indent=2) + "\n")
+    print(f"Wrote {os.path.relpath(path, ROOT)}", file=sys.stderr)
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                cwd=ROOT,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+        )
+    except OSError:
+        return None, None
+    return commit or None, dirty
+
+
+def main(args):
+    results = {}
+    failures = {}
+    for name in args.case or CASES:
+        spider_cls, callback, fixture, url, kwargs, golden, functions = CASES[name]
+        with open(os.path.join(FIXTURES, fixture), "rb") as f:
+            body = f.read()
+        crawler = get_crawler(spider_cls, {"LOG_LEVEL": "WARNING"})
+        spider = spider_cls.from_crawler(crawler, **kwargs)
+
+        items = run_callback(spider, callback, url, body)
+        if args.write_golden:
+            write_golden(golden, items)
+        mismatches = compare_golden(golden, items)
+        if mismatches:
+            failures[name] = mismatches
+
+        results[name] = {
+            "callback": f"{spider_cls.__name__}.{callback}",
+            "fixture": fixture,
+            "fixture_bytes": len(body),
+            "golden_match": not mismatches,
+            "throughput": measure_throughput(spider, callback, url, body, args.rounds),
+            "field_ms_per_page": measure_fields(
+                spider, callback, url, body, functions, args.field_rounds
+            ),
+            "memory": measure_memory(spider, callback, url, body),
+        }
+        print(
+            f"{name}: {results[name]['throughput']['pages_per_sec']} pages/sec",
+            file=sys.stderr,
+        )
+
+    commit, dirty = git_commit()
+    output = {
+        "benchmark": "parsers",
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "rounds": args.rounds,
+        "results": results,
+    }
+    text = json.dumps(output, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if failures:
+        for name, mismatches in failures.items():
+            for mismatch in mismatches:
+                print(f"{name}: golden mismatch in {mismatch}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--case", action="append", choices=list(CASES), help="run only this case"
+    )
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument(
+        "--field-rounds", type=int, default=50, help="rounds of the per-field pass"
+    )
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument(
+        "--write-golden",
+        action="store_true",
+        help="overwrite the golden files with the current output",
+    )
+    main(parser.parse_args())
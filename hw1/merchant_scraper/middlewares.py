@@ -3,12 +3,16 @@
 """
 Custom middlewares for merchant_scraper project.
 
-Currently, these middlewares don't add any custom logic — all methods are default stubs.
-You can use these classes as a template to add request/response modification or logging in the future.
+- The spider middleware is a default stub (logs spider open).
+- The downloader middleware records responses to / replays them from WARC
+  archives (WARC_MODE, see scraping_common/warc.py); it does nothing when
+  WARC_MODE is "off".
 """
 
 from scrapy import signals
 
+from scraping_common.warc import WarcMiddleware
+
 
 class MerchantScraperSpiderMiddleware:
     """Default spider middleware (no custom logic, just logs spider open)."""
@@ -33,23 +37,9 @@ class MerchantScraperSpiderMiddleware:
         spider.logger.info(f"Spider opened: {spider.name}")
 
 
-class MerchantScraperDownloaderMiddleware:
-    """Default downloader middleware (no custom logic, just logs spider open)."""
-
-    @classmethod
-    def from_crawler(cls, crawler):
-        s = cls()
-        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
-        return s
-
-    def process_request(self, request, spider):
-        return None
-
-    def process_response(self, request, response, spider):
-        return response
-
-    def process_exception(self, request, exception, spider):
-        pass
+class MerchantScraperDownloaderMiddleware(WarcMiddleware):
+    """WARC record/replay downloader middleware (WARC_MODE), logs spider open."""
 
     def spider_opened(self, spider):
         spider.logger.info(f"Spider opened: {spider.name}")
+        super().spider_opened(spider)
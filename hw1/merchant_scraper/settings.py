@@ -6,6 +6,11 @@ Scrapy project settings for merchant_scraper.
 - Configures User-Agent rotation and retry logic for stable scraping.
 - Limits request rate for polite crawling.
 - Sets UTF-8 export, CSV column order, and pipeline activation.
+- Optionally records responses to / replays them from WARC archives.
+- Caches pages and revalidates them with conditional requests on repeat crawls.
+
+Requires the repository root on PYTHONPATH for the shared scraping_common
+package (e.g. from hw1/: PYTHONPATH=.. scrapy crawl merchants).
 """
 
 BOT_NAME = "merchant_scraper"
@@ -40,11 +45,36 @@ DOWNLOADER_MIDDLEWARES = {
     "scrapy.downloadermiddlewares.useragent.UserAgentMiddleware": None,
     "scrapy_fake_useragent.middleware.RandomUserAgentMiddleware": 400,
     "scrapy.downloadermiddlewares.retry.RetryMiddleware": 90,
+    # Conditional HTTP cache with compressed storage (see HTTPCACHE_* below)
+    "scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware": None,
+    "scraping_common.httpcache.ConditionalHttpCacheMiddleware": 900,
+    # WARC record/replay, next to the downloader (see WARC_MODE below)
+    "merchant_scraper.middlewares.MerchantScraperDownloaderMiddleware": 950,
 }
 
 # Retry settings (handle blocks/timeouts)
 RETRY_TIMES = 5
 
+# Response record/replay (scraping_common/warc.py): "off", "record" (write every
+# downloaded response to WARC archives in WARC_DIR) or "replay" (answer requests
+# from those archives, no network), e.g. scrapy crawl <spider> -s WARC_MODE=replay
+WARC_MODE = "off"
+WARC_DIR = "warc"
+WARC_MAX_FILE_SIZE = 1024**3  # start a new .warc.gz file after 1 GB
+
+# Conditional HTTP cache (scraping_common/httpcache.py): repeat crawls send
+# If-None-Match/If-Modified-Since and take unchanged pages (304) from a local
+# zstd-compressed store; Playwright requests are never cached. Turned off
+# automatically while WARC_MODE is record/replay (archives need full bodies)
+HTTPCACHE_ENABLED = True
+HTTPCACHE_DIR = "httpcache"
+HTTPCACHE_STORAGE = "scraping_common.httpcache.CompressedCacheStorage"
+HTTPCACHE_POLICY = "scraping_common.httpcache.ConditionalCachePolicy"
+# Revalidate every page that has an ETag/Last-Modified instead of guessing freshness
+HTTPCACHE_ALWAYS_REVALIDATE = True
+# Max size of the compressed bodies; least recently used entries are evicted beyond it
+HTTPCACHE_MAX_SIZE = 2 * 1024**3
+
 # Enable the data cleaning pipeline
 ITEM_PIPELINES = {
     "merchant_scraper.pipelines.MerchantScraperPipeline": 300,
@@ -0,0 +1,71 @@
+# hw2/backfill_isbn_normalized.py
+
+"""
+One-off migration: sets isbn_normalized on books stored before it existed.
+
+- Books crawled before the field was added have no isbn_normalized, so the
+  API only finds them by their exact raw ISBN (no ISBN-10 / hyphenated
+  variant matching) until they are recrawled. This fills the field in place.
+- Also replaces isbn_normalized = "" (written for books without an ISBN by
+  older versions of the pipeline) with null, so no lookup can match them.
+- Idempotent; updates are sent as unordered bulk writes of --batch-size.
+
+Run from hw2/ (uses the same BOOKS_MONGO_* variables as the API):
+    python backfill_isbn_normalized.py [--batch-size 1000] [--dry-run]
+"""
+
+import argparse
+import os
+
+from pymongo import MongoClient, UpdateOne
+
+from book_scraper.isbn import normalize_isbn
+
+MONGO_URI = os.getenv("BOOKS_MONGO_URI", "mongodb://localhost:27017")
+MONGO_DATABASE = os.getenv("BOOKS_MONGO_DATABASE", "books")
+MONGO_COLLECTION = os.getenv("BOOKS_MONGO_COLLECTION", "books")
+
+
+def backfill(collection, batch_size, dry_run=False):
+    """Returns (documents checked, documents updated)."""
+    query = {"$or": [{"isbn_normalized": {"$exists": False}}, {"isbn_normalized": ""}]}
+    checked = updated = 0
+    operations = []
+    for doc in collection.find(query, {"isbn": 1}):
+        checked += 1
+        key = normalize_isbn(doc.get("isbn")) or None
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"isbn_normalized": key}}))
+        if len(operations) >= batch_size:
+            updated += flush(collection, operations, dry_run)
+            operations = []
+    if operations:
+        updated += flush(collection, operations, dry_run)
+    return checked, updated
+
+
+def flush(collection, operations, dry_run):
+    if dry_run:
+        return len(operations)
+    return collection.bulk_write(operations, ordered=False).modified_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="count the documents, change nothing"
+    )
+    args = parser.parse_args()
+
+    client = MongoClient(MONGO_URI)
+    try:
+        collection = client[MONGO_DATABASE][MONGO_COLLECTION]
+        checked, updated = backfill(collection, args.batch_size, args.dry_run)
+    finally:
+        client.close()
+    action = "would update" if args.dry_run else "updated"
+    print(f"{checked} books without isbn_normalized, {action} {updated}")
+
+
+if __name__ == "__main__":
+    main()
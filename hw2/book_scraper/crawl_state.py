@@ -0,0 +1,87 @@
+# hw2/book_scraper/crawl_state.py
+
+"""
+Persistent per-URL crawl state for incremental sitemap crawls (SQLite).
+
+- Stores each product URL with the sitemap <lastmod> it had when it was
+  last fetched successfully, and the time of that fetch.
+- should_fetch() decides whether a sitemap entry needs downloading: new URL,
+  changed or missing <lastmod>, or last fetch older than the full-refresh
+  interval.
+- Writes are buffered and committed in batches; close() commits the rest.
+  WAL mode lets several shard processes on one host share the file.
+"""
+
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sitemap_urls (
+    url TEXT PRIMARY KEY,
+    lastmod TEXT,
+    fetched_at REAL NOT NULL
+)
+"""
+
+
+class SitemapCrawlState:
+    def __init__(self, path, full_refresh_days=7.0, commit_every=500):
+        self.path = path
+        self.full_refresh_seconds = full_refresh_days * 86400
+        self.commit_every = commit_every
+        self.connection = None
+        self.pending = []
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            path=settings.get("SITEMAP_STATE_DB", "sitemap_state.sqlite3"),
+            full_refresh_days=settings.getfloat("SITEMAP_FULL_REFRESH_DAYS", 7.0),
+        )
+
+    def open(self):
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+        return self
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM sitemap_urls").fetchone()[0]
+
+    def should_fetch(self, url, lastmod, now=None):
+        """Returns (fetch, reason); reason is "new", "changed", "no_lastmod", "refresh" or "unchanged"."""
+        row = self.connection.execute(
+            "SELECT lastmod, fetched_at FROM sitemap_urls WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return True, "new"
+        stored_lastmod, fetched_at = row
+        if not lastmod:
+            return True, "no_lastmod"
+        if lastmod != stored_lastmod:
+            return True, "changed"
+        if (now or time.time()) - fetched_at >= self.full_refresh_seconds:
+            return True, "refresh"
+        return False, "unchanged"
+
+    def mark_fetched(self, url, lastmod, fetched_at=None):
+        self.pending.append((url, lastmod, fetched_at or time.time()))
+        if len(self.pending) >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        if self.pending:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO sitemap_urls (url, lastmod, fetched_at) "
+                "VALUES (?, ?, ?)",
+                self.pending,
+            )
+            self.connection.commit()
+            self.pending = []
+
+    def close(self):
+        if self.connection is not None:
+            self.commit()
+            self.connection.close()
+            self.connection = None
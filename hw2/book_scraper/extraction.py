@@ -0,0 +1,289 @@
+# hw2/book_scraper/extraction.py
+
+"""
+Single-pass extraction of chitai-gorod product pages.
+
+- extract_book() walks the parsed lxml tree once and picks up the same
+  nodes the spider's XPath extraction reads (microdata itemprop spans,
+  author meta tags, price, description, cover), with the same "first match
+  in document order" semantics, so both paths build the same item.
+- The product-properties list is read once into a {title: value} dict
+  instead of one XPath query per property.
+- An embedded JSON-LD Book/Product block, if present, only fills fields the
+  markup didn't provide.
+"""
+
+import json
+import re
+
+COVER_STYLE_RE = re.compile(r"url\(['\"]?(https?://[^\)'\"]+)")
+
+
+def first_text(elem):
+    """First text node child of elem (XPath "elem/text()" .get())."""
+    if elem.text is not None:
+        return elem.text
+    for child in elem:
+        if child.tail is not None:
+            return child.tail
+    return None
+
+
+def element_text_nodes(elem):
+    """All text nodes of elem's own children and itself (XPath "elem/text()")."""
+    if elem.text is not None:
+        yield elem.text
+    for child in elem:
+        if child.tail is not None:
+            yield child.tail
+
+
+def has_class(elem, name, exact=False):
+    classes = elem.get("class")
+    if classes is None:
+        return False
+    return classes == name if exact else name in classes
+
+
+def child_span_text(elem):
+    """XPath "elem/span/text()" .get()."""
+    for child in elem:
+        if child.tag == "span":
+            text = first_text(child)
+            if text is not None:
+                return text
+    return None
+
+
+def publisher_text(elem):
+    """XPath "elem/a/text() | elem/text()" .get(), in document order."""
+    if elem.text is not None:
+        return elem.text
+    for child in elem:
+        if child.tag == "a":
+            for text in element_text_nodes(child):
+                return text
+        if child.tail is not None:
+            return child.tail
+    return None
+
+
+def read_properties(ul):
+    """product-properties list -> {title text: first value span text}."""
+    properties = {}
+    for li in ul:
+        if li.tag != "li":
+            continue
+        title = content = None
+        for span in li:
+            if span.tag != "span":
+                continue
+            if has_class(span, "product-properties-item__title", exact=True):
+                title = span
+            elif has_class(span, "product-properties-item__content", exact=True):
+                content = span
+        if title is None or content is None:
+            continue
+        key = first_text(title)  # contains(text(), ...) tests the first text node
+        if key is not None:
+            properties.setdefault(key, first_descendant_span_text(content))
+    return properties
+
+
+def first_descendant_span_text(container):
+    """XPath "container//span/text()" .get(), in document order."""
+
+    def walk(elem):
+        is_span = elem.tag == "span"
+        if is_span and elem.text is not None:
+            return elem.text
+        for child in elem:
+            text = walk(child)
+            if text is not None:
+                return text
+            if is_span and child.tail is not None:
+                return child.tail
+        return None
+
+    for child in container:
+        text = walk(child)
+        if text is not None:
+            return text
+    return None
+
+
+def lookup_property(properties, name):
+    """Value of the first property whose title contains `name`."""
+    for title, value in properties.items():
+        if name in title and value is not None:
+            return value
+    return None
+
+
+def json_ld_book(scripts):
+    """First Book/Product object from JSON-LD script bodies, or None."""
+    for text in scripts:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            continue
+        candidates = data if isinstance(data, list) else [data]
+        if isinstance(data, dict) and "@graph" in data:
+            candidates = data["@graph"]
+        for obj in candidates:
+            if not isinstance(obj, dict):
+                continue
+            types = obj.get("@type")
+            types = types if isinstance(types, list) else [types]
+            if "Book" in types or "Product" in types:
+                return obj
+    return None
+
+
+def names(value):
+    values = value if isinstance(value, list) else [value]
+    result = []
+    for v in values:
+        name = v.get("name") if isinstance(v, dict) else v
+        if name:
+            result.append(str(name))
+    return result
+
+
+def fields_from_json_ld(obj):
+    fields = {}
+    if obj.get("name"):
+        fields["title"] = obj["name"]
+    authors = names(obj.get("author"))
+    if authors:
+        fields["author"] = ", ".join(authors)
+    if obj.get("description"):
+        fields["description"] = [obj["description"]]
+    offers = obj.get("offers")
+    offers = offers[0] if isinstance(offers, list) and offers else offers
+    if isinstance(offers, dict) and offers.get("price") not in (None, ""):
+        price = "".join(filter(str.isdigit, str(offers["price"]).split(".")[0]))
+        if price:
+            fields["price_amount"] = price
+            fields["price_currency"] = "₽"
+    rating = obj.get("aggregateRating")
+    if isinstance(rating, dict):
+        if rating.get("ratingValue") is not None:
+            fields["rating_value"] = str(rating["ratingValue"])
+        count = rating.get("ratingCount", rating.get("reviewCount"))
+        if count is not None:
+            fields["rating_count"] = str(count)
+    for key, field in (
+        ("isbn", "isbn"),
+        ("numberOfPages", "pages_cnt"),
+        ("datePublished", "publication_year"),
+    ):
+        if obj.get(key):
+            fields[field] = str(obj[key])[:4] if key == "datePublished" else str(obj[key])
+    publishers = names(obj.get("publisher"))
+    if publishers:
+        fields["publisher"] = publishers[0]
+    image = obj.get("image")
+    image = image[0] if isinstance(image, list) and image else image
+    if isinstance(image, dict):
+        image = image.get("url")
+    if image:
+        fields["book_cover"] = image
+    return fields
+
+
+def extract_book(root):
+    """
+    Extracts raw book fields from a parsed product page (lxml root, e.g.
+    response.selector.root) in one walk; values are the same raw strings the
+    XPath extraction produces and are cleaned by BookScraperPipeline.
+    """
+    found = {}
+    authors = []
+    description = []
+    properties = {}
+    cover_img = cover_style = None
+    scripts = []
+
+    for elem in root.iter("span", "h1", "ul", "article", "div", "button", "script"):
+        tag = elem.tag
+        if tag == "span":
+            itemprop = elem.get("itemprop")
+            if itemprop in ("ratingValue", "ratingCount"):
+                key = "rating_value" if itemprop == "ratingValue" else "rating_count"
+                if key not in found:
+                    text = first_text(elem)
+                    if text is not None:
+                        found[key] = text
+            elif itemprop in ("isbn", "numberOfPages"):
+                key = "isbn" if itemprop == "isbn" else "pages_cnt"
+                if key not in found:
+                    text = child_span_text(elem)
+                    if text is not None:
+                        found[key] = text
+            elif itemprop == "publisher" and "publisher" not in found:
+                text = publisher_text(elem)
+                if text is not None:
+                    found["publisher"] = text
+            if "price" not in found and has_class(elem, "product-offer-price__actual"):
+                text = first_text(elem)
+                if text is not None:
+                    found["price"] = text
+        elif tag == "h1":
+            if elem.get("itemprop") == "name" and "title" not in found:
+                text = first_text(elem)
+                if text is not None:
+                    found["title"] = text
+        elif tag == "ul":
+            if has_class(elem, "product-authors", exact=True):
+                for meta in elem.iterdescendants("meta"):
+                    if meta.get("itemprop") == "name" and meta.get("content") is not None:
+                        authors.append(meta.get("content"))
+            elif has_class(elem, "product-properties", exact=True):
+                for title, value in read_properties(elem).items():
+                    properties.setdefault(title, value)
+        elif tag == "article":
+            if has_class(elem, "product-detail-page__detail-text"):
+                description.extend(elem.itertext())
+        elif tag == "div":
+            if cover_img is None and has_class(elem, "product-detail-page_media"):
+                for img in elem.iterdescendants("img"):
+                    if img.get("src") is not None:
+                        cover_img = img.get("src")
+                        break
+        elif tag == "button":
+            if cover_style is None and has_class(elem, "product-preview__button"):
+                cover_style = elem.get("style")
+        elif tag == "script":
+            if elem.get("type") == "application/ld+json" and elem.text:
+                scripts.append(elem.text)
+
+    price = None
+    if found.get("price"):
+        price = "".join(filter(str.isdigit, found["price"]))
+    book_cover = cover_img
+    if not book_cover and cover_style:
+        m = COVER_STYLE_RE.search(cover_style)
+        book_cover = m.group(1) if m else None
+
+    fields = {
+        "title": found.get("title"),
+        "author": ", ".join(authors) if authors else None,
+        "description": description or None,
+        "price_amount": price or None,
+        "price_currency": "₽" if price else None,
+        "rating_value": found.get("rating_value"),
+        "rating_count": found.get("rating_count"),
+        "publication_year": lookup_property(properties, "Год издания") or None,
+        "isbn": found.get("isbn"),
+        "pages_cnt": found.get("pages_cnt"),
+        "publisher": found.get("publisher"),
+        "book_cover": book_cover or None,
+    }
+
+    ld = json_ld_book(scripts) if scripts else None
+    if ld is not None:
+        for key, value in fields_from_json_ld(ld).items():
+            if fields[key] is None:
+                fields[key] = value
+    return fields
@@ -0,0 +1,43 @@
+# hw2/book_scraper/indexes.py
+
+"""
+MongoDB indexes required by the books collection.
+
+Shared by MongoDBPipeline (ensured on open_spider) and by
+fastapi_service_books.py (ensured on startup).
+"""
+
+from pymongo import ASCENDING, TEXT, IndexModel
+
+BOOK_INDEXES = [
+    # Upsert key and /search_by_isbn lookups; items without ISBN are not indexed
+    IndexModel(
+        [("isbn", ASCENDING)],
+        name="isbn_unique",
+        unique=True,
+        partialFilterExpression={"isbn": {"$type": "string", "$gt": ""}},
+    ),
+    # Lookups by any ISBN variant (ISBN-10/13, hyphenated or not)
+    IndexModel([("isbn_normalized", ASCENDING)], name="isbn_normalized"),
+    # /search: title/author prefix matches (anchored regex) and filters. It
+    # sorts and paginates by (field, _id) of the field that bounds the scan,
+    # so every filterable field is paired with _id
+    IndexModel([("title", ASCENDING), ("_id", ASCENDING)], name="title_id"),
+    IndexModel([("author", ASCENDING), ("_id", ASCENDING)], name="author_id"),
+    IndexModel([("publisher", ASCENDING), ("_id", ASCENDING)], name="publisher_id"),
+    IndexModel(
+        [("publication_year", ASCENDING), ("_id", ASCENDING)],
+        name="publication_year_id",
+    ),
+    IndexModel(
+        [("price_amount", ASCENDING), ("_id", ASCENDING)], name="price_amount_id"
+    ),
+    # /export: "updated since" deltas, keyset-paginated by (updated_at, _id)
+    IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at_id"),
+    # Full-text search over title and author
+    IndexModel(
+        [("title", TEXT), ("author", TEXT)],
+        name="title_author_text",
+        default_language="russian",
+    ),
+]
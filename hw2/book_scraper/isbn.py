@@ -0,0 +1,32 @@
+# hw2/book_scraper/isbn.py
+
+"""
+ISBN normalization.
+
+ISBN-10 and ISBN-13, with or without hyphens/spaces, are mapped to one key:
+the 13-digit form without separators. Used by BookScraperPipeline (stored as
+isbn_normalized) and by the books API to match any variant of the same book.
+"""
+
+import re
+
+
+def isbn10_to_isbn13(isbn10):
+    """Converts a clean 10-character ISBN to ISBN-13 (978 prefix, new check digit)."""
+    core = "978" + isbn10[:9]
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(core))
+    return core + str((10 - total % 10) % 10)
+
+
+def normalize_isbn(value):
+    """
+    Returns the normalized ISBN-13 key, e.g. "5-17-035255-7" -> "9785170352555".
+    Values that are not a 10/13-character ISBN are returned cleaned but as is;
+    values without any ISBN characters give "" (callers treat it as no ISBN).
+    """
+    if not value:
+        return ""
+    clean = re.sub(r"[^0-9Xx]", "", str(value)).upper()
+    if len(clean) == 10 and clean[:9].isdigit():
+        return isbn10_to_isbn13(clean)
+    return clean
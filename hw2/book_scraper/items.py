@@ -27,6 +27,8 @@ class BookScraperItem(scrapy.Item):
     publication_year = scrapy.Field()
     # ISBN number (required)
     isbn = scrapy.Field()
+    # ISBN normalized to 13 digits without separators (set by the pipeline)
+    isbn_normalized = scrapy.Field()
     # Number of pages (required)
     pages_cnt = scrapy.Field()
     # Publisher (optional)
@@ -4,10 +4,12 @@
 Pipeline for post-processing items and saving to MongoDB (if needed).
 """
 
-from itemadapter import ItemAdapter
-import pymongo
 import re
 
+from book_scraper.indexes import BOOK_INDEXES
+from book_scraper.isbn import normalize_isbn
+from scraping_common.mongo import MongoDBPipeline as BaseMongoDBPipeline
+
 
 class BookScraperPipeline:
     """Cleans up item fields, types, and strings."""
@@ -77,6 +79,10 @@ class BookScraperPipeline:
             else:
                 item[field] = str(val)
 
+        # Normalized ISBN-13 key, so hyphenated/ISBN-10 variants match;
+        # None (not "") for books without an ISBN, so nothing looks them up
+        item["isbn_normalized"] = normalize_isbn(item.get("isbn")) or None
+
         # Debug print for pipeline pass-through
         print(
             f"[BookScraperPipeline] Processed item: {item.get('title')}, ISBN: {item.get('isbn')}"
@@ -84,40 +90,15 @@ class BookScraperPipeline:
         return item
 
 
-class MongoDBPipeline:
-    """Pipeline to save items into MongoDB."""
-
-    def __init__(self, mongodb_uri, mongodb_db, mongodb_collection):
-        self.mongodb_uri = mongodb_uri
-        self.mongodb_db = mongodb_db
-        self.mongodb_collection = mongodb_collection
-
-    @classmethod
-    def from_crawler(cls, crawler):
-        return cls(
-            mongodb_uri=crawler.settings.get(
-                "MONGODB_URI", "mongodb://localhost:27017"
-            ),
-            mongodb_db=crawler.settings.get("MONGODB_DATABASE", "books"),
-            mongodb_collection=crawler.settings.get("MONGODB_COLLECTION", "books"),
-        )
+class MongoDBPipeline(BaseMongoDBPipeline):
+    """Pipeline to save items into MongoDB (buffered bulk upserts by ISBN)."""
 
-    def open_spider(self, spider):
-        print("[MongoDBPipeline] Connecting to MongoDB...")
-        self.client = pymongo.MongoClient(self.mongodb_uri)
-        self.db = self.client[self.mongodb_db]
-        self.collection = self.db[self.mongodb_collection]
+    KEY_FIELD = "isbn"
+    DEFAULT_DATABASE = "books"
+    DEFAULT_COLLECTION = "books"
+    INDEXES = BOOK_INDEXES
 
-    def close_spider(self, spider):
-        print("[MongoDBPipeline] Closing MongoDB connection.")
-        self.client.close()
-
-    def process_item(self, item, spider):
-        data = ItemAdapter(item).asdict()
+    def log_item(self, data, spider):
         print(
             f"[MongoDBPipeline] Saving item: {data.get('title')} (ISBN: {data.get('isbn')})"
         )
-        self.collection.update_one(
-            {"isbn": data.get("isbn")}, {"$set": data}, upsert=True
-        )
-        return item
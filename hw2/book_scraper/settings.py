@@ -9,6 +9,11 @@ Scrapy project settings for book_scraper.
 - Configures User-Agent rotation and retry logic.
 - Sets logging level.
 - Enables AutoThrottle for extra politeness.
+- Optionally records responses to / replays them from WARC archives.
+- Caches pages and revalidates them with conditional requests on repeat crawls.
+
+Requires the repository root on PYTHONPATH for the shared scraping_common
+package (e.g. from hw2/: PYTHONPATH=.. scrapy crawl chitai_gorod_sitemap).
 """
 
 BOT_NAME = "book_scraper"
@@ -33,6 +38,7 @@ FEED_EXPORT_FIELDS = [
     "rating_count",
     "publication_year",
     "isbn",
+    "isbn_normalized",
     "pages_cnt",
     "publisher",
     "book_cover",
@@ -44,10 +50,35 @@ DOWNLOADER_MIDDLEWARES = {
     "scrapy.downloadermiddlewares.useragent.UserAgentMiddleware": None,
     "scrapy_fake_useragent.middleware.RandomUserAgentMiddleware": 400,
     "scrapy.downloadermiddlewares.retry.RetryMiddleware": 90,
+    # Conditional HTTP cache with compressed storage (see HTTPCACHE_* below)
+    "scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware": None,
+    "scraping_common.httpcache.ConditionalHttpCacheMiddleware": 900,
+    # WARC record/replay, next to the downloader (see WARC_MODE below)
+    "book_scraper.middlewares.BookScraperDownloaderMiddleware": 950,
 }
 
 RETRY_TIMES = 5  # On errors, try again up to 5 times
 
+# Response record/replay (scraping_common/warc.py): "off", "record" (write every
+# downloaded response to WARC archives in WARC_DIR) or "replay" (answer requests
+# from those archives, no network), e.g. scrapy crawl <spider> -s WARC_MODE=replay
+WARC_MODE = "off"
+WARC_DIR = "warc"
+WARC_MAX_FILE_SIZE = 1024**3  # start a new .warc.gz file after 1 GB
+
+# Conditional HTTP cache (scraping_common/httpcache.py): repeat crawls send
+# If-None-Match/If-Modified-Since and take unchanged pages (304) from a local
+# zstd-compressed store; Playwright requests are never cached. Turned off
+# automatically while WARC_MODE is record/replay (archives need full bodies)
+HTTPCACHE_ENABLED = True
+HTTPCACHE_DIR = "httpcache"
+HTTPCACHE_STORAGE = "scraping_common.httpcache.CompressedCacheStorage"
+HTTPCACHE_POLICY = "scraping_common.httpcache.ConditionalCachePolicy"
+# Revalidate every page that has an ETag/Last-Modified instead of guessing freshness
+HTTPCACHE_ALWAYS_REVALIDATE = True
+# Max size of the compressed bodies; least recently used entries are evicted beyond it
+HTTPCACHE_MAX_SIZE = 2 * 1024**3
+
 # Enable data post-processing pipeline (for description cleanup etc)
 ITEM_PIPELINES = {
     "book_scraper.pipelines.BookScraperPipeline": 100,
@@ -58,6 +89,22 @@ ITEM_PIPELINES = {
 MONGODB_URI = "mongodb://localhost:27017"
 MONGODB_DATABASE = "books"
 MONGODB_COLLECTION = "books"
+# Upserts are buffered and written with one bulk_write per batch
+MONGODB_BATCH_SIZE = 100  # flush when this many items are buffered...
+MONGODB_FLUSH_INTERVAL = 5.0  # ...or when this many seconds have passed
+# Writes run on a dedicated thread pool, off the reactor thread
+MONGODB_WRITER_THREADS = 2
+# Max batches queued/in flight before items are held back (backpressure)
+MONGODB_MAX_PENDING_BATCHES = 4
+# Create required indexes on open_spider (False: only log the missing ones)
+MONGODB_ENSURE_INDEXES = True
+# Load stored content fingerprints on open_spider, so unchanged items are not rewritten
+MONGODB_PRELOAD_FINGERPRINTS = True
+
+# Incremental sitemap crawls (-a incremental=1): per-URL <lastmod> state
+SITEMAP_STATE_DB = "sitemap_state.sqlite3"
+# Refetch unchanged product pages anyway once their last fetch is this old
+SITEMAP_FULL_REFRESH_DAYS = 7
 
 # Limit how many items to scrape before shutting down spider
 CLOSESPIDER_ITEMCOUNT = 1000
@@ -0,0 +1,104 @@
+# hw2/book_scraper/sitemap_stream.py
+
+"""
+Incremental sitemap reader (bounded memory for large/gzip sitemaps).
+
+- open_sitemap_body() wraps the response body in a file-like reader,
+  decompressing gzip on the fly (capped at max_size bytes).
+- StreamingSitemap parses it with lxml iterparse: the sitemap type
+  (urlset / sitemapindex) is known after the root tag, and each <url> or
+  <sitemap> entry is yielded as soon as it is read, then freed, so the
+  parsed tree never grows beyond one entry.
+
+Entries have the same shape as scrapy.utils.sitemap.Sitemap's
+({"loc": ..., "lastmod": ..., "alternate": [...]}), so sitemap_filter()
+and the SitemapSpider helpers work unchanged.
+"""
+
+import gzip
+import io
+
+from lxml import etree
+from scrapy.http import XmlResponse
+
+
+class SitemapTooLarge(Exception):
+    pass
+
+
+class LimitedReader:
+    """File-like wrapper that raises once more than max_size bytes were read."""
+
+    def __init__(self, fileobj, max_size):
+        self.fileobj = fileobj
+        self.max_size = max_size
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.bytes_read += len(data)
+        if self.max_size and self.bytes_read > self.max_size:
+            raise SitemapTooLarge(
+                f"Decompressed sitemap is larger than {self.max_size} bytes"
+            )
+        return data
+
+
+def open_sitemap_body(response, max_size=0):
+    """
+    Returns a file-like reader over the sitemap XML, or None if the response
+    is not a sitemap (same rules as SitemapSpider._get_sitemap_body).
+    """
+    body = response.body
+    if body[:2] == b"\x1f\x8b":
+        return LimitedReader(gzip.GzipFile(fileobj=io.BytesIO(body)), max_size)
+    # .xml.gz served with Content-Encoding: gzip was already decompressed
+    # by HttpCompressionMiddleware
+    if isinstance(response, XmlResponse) or response.url.endswith((".xml", ".xml.gz")):
+        return io.BytesIO(body)
+    return None
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+class StreamingSitemap:
+    def __init__(self, source):
+        self.events = etree.iterparse(
+            source,
+            events=("start", "end"),
+            recover=True,
+            remove_comments=True,
+            resolve_entities=False,
+            no_network=True,
+            huge_tree=True,
+        )
+        self.root = None
+        self.type = None
+        for event, elem in self.events:
+            if event == "start":
+                self.root = elem
+                self.type = local_name(elem.tag)
+                break
+
+    def __iter__(self):
+        if self.root is None:
+            return
+        for event, elem in self.events:
+            if event != "end" or elem.getparent() is not self.root:
+                continue
+            entry = {}
+            for child in elem:
+                name = local_name(child.tag)
+                if name == "link":
+                    if "href" in child.attrib:
+                        entry.setdefault("alternate", []).append(child.get("href"))
+                else:
+                    entry[name] = child.text.strip() if child.text else ""
+            # Free the entry and everything parsed before it
+            elem.clear()
+            while elem.getprevious() is not None:
+                del self.root[0]
+            if "loc" in entry:
+                yield entry
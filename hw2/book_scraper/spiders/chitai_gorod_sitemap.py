@@ -4,22 +4,55 @@
 Spider for extracting book data from chitai-gorod.ru using their sitemap.
 
 - Uses Scrapy's SitemapSpider for efficient crawling.
+- Sitemaps are parsed incrementally (gzip included): product requests are
+  produced while the sitemap is still being read, with flat memory use.
 - Parses book detail pages and extracts all relevant fields.
 - Applies custom headers to mimic real browser requests.
+- incremental=1: skips product URLs whose sitemap <lastmod> hasn't changed
+  since their last successful fetch (state in SITEMAP_STATE_DB), forcing a
+  refetch after SITEMAP_FULL_REFRESH_DAYS.
+- shard_index=i, shard_count=n: handles only product URLs with
+  md5(url) % n == i, so n processes (see run_shards.py) split the catalogue.
+- Product pages are read with one XPath query per field by default;
+  extraction_mode=structured reads them in one pass over the parsed tree
+  (extraction.py). That pass is ~3x faster than the queries, but the HTML
+  parse dominates, so a whole page is only 1.0-1.2x faster
+  (benchmarks/bench_book_parse.py).
 """
 
+import hashlib
 import scrapy
 from scrapy.spiders import SitemapSpider
+from book_scraper.crawl_state import SitemapCrawlState
+from book_scraper.extraction import extract_book
 from book_scraper.items import BookScraperItem
+from book_scraper.sitemap_stream import (
+    SitemapTooLarge,
+    StreamingSitemap,
+    open_sitemap_body,
+)
+from lxml import etree
 import re
 
 
+def url_shard(url, shard_count):
+    """Stable shard number of a URL (same on every run, process and node)."""
+    digest = hashlib.md5(url.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
 class ChitaiGorodSitemapSpider(SitemapSpider):
     # Spider name (run with: scrapy crawl chitai_gorod_sitemap)
     name = "chitai_gorod_sitemap"
     allowed_domains = ["chitai-gorod.ru"]
     sitemap_urls = ["https://www.chitai-gorod.ru/sitemap.xml"]
     sitemap_rules = [("/product/", "parse")]
+    incremental = False
+    shard_index = 0
+    shard_count = 1
+    extraction_mode = "xpath"
+
+    EXTRACTION_MODES = ("xpath", "structured")
 
     # Custom browser-like headers for requests
     custom_headers = {
@@ -31,6 +64,24 @@ class ChitaiGorodSitemapSpider(SitemapSpider):
         "Referer": "https://www.chitai-gorod.ru/",
     }
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.setup_sharding()
+        spider.setup_incremental()
+        if spider.extraction_mode not in cls.EXTRACTION_MODES:
+            raise ValueError(
+                f"extraction_mode must be one of {cls.EXTRACTION_MODES}, "
+                f"got {spider.extraction_mode!r}"
+            )
+        return spider
+
+    async def start(self):
+        # Scrapy >= 2.13 calls start() and SitemapSpider's own version
+        # would bypass start_requests() and its headers
+        for request in self.start_requests():
+            yield request
+
     def start_requests(self):
         """
         Initial request for the sitemap, uses custom headers.
@@ -43,13 +94,108 @@ class ChitaiGorodSitemapSpider(SitemapSpider):
                 dont_filter=True,
             )
 
-    def _requests_to_follow(self, response):
+    def setup_sharding(self):
+        self.shard_index = int(self.shard_index)
+        self.shard_count = int(self.shard_count)
+        if not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(
+                f"shard_index must be in [0, {self.shard_count}), got {self.shard_index}"
+            )
+        if self.shard_count > 1:
+            self.logger.info(f"Shard {self.shard_index} of {self.shard_count}")
+
+    def setup_incremental(self):
+        """Opens the crawl-state store if the spider runs with -a incremental=1."""
+        self.incremental = str(self.incremental).lower() in ("1", "true", "yes")
+        self.crawl_state = None
+        self.sitemap_lastmod = {}  # product URL -> <lastmod>, until it is parsed
+        if not self.incremental:
+            return
+        self.crawl_state = SitemapCrawlState.from_settings(self.settings).open()
+        self.logger.info(
+            f"Incremental mode: {len(self.crawl_state)} known product URLs, "
+            f"full refresh after {self.settings.getfloat('SITEMAP_FULL_REFRESH_DAYS', 7.0)} days"
+        )
+
+    def sitemap_filter(self, entries):
+        """
+        Drops product entries of other shards and, in incremental mode, the
+        ones that haven't changed since their last fetch. Only <urlset> pages
+        matched by sitemap_rules count as products; entries of a sitemap index
+        always pass, so every shard reads the whole sitemap tree.
+        """
+        if getattr(entries, "type", None) != "urlset":
+            yield from entries
+            return
+        stats = self.crawler.stats
+        for entry in entries:
+            loc = entry.get("loc", "")
+            if not any(regex.search(loc) for regex, _ in self._cbs):
+                yield entry
+                continue
+            shard = url_shard(loc, self.shard_count) if self.shard_count > 1 else 0
+            if shard != self.shard_index:
+                stats.inc_value("sitemap/product_urls/other_shard")
+                continue
+            if self.crawl_state is not None:
+                fetch, reason = self.crawl_state.should_fetch(loc, entry.get("lastmod"))
+                stats.inc_value(f"sitemap/product_urls/{reason}")
+                if not fetch:
+                    stats.inc_value("sitemap/product_urls/skipped")
+                    continue
+                self.sitemap_lastmod[loc] = entry.get("lastmod")
+            stats.inc_value("sitemap/product_urls/fetched")
+            yield entry
+
+    def record_fetched(self, response):
+        """Remembers the <lastmod> of a successfully fetched product page."""
+        if self.crawl_state is None:
+            return
+        url = response.meta.get("redirect_urls", [response.url])[0]
+        self.crawl_state.mark_fetched(url, self.sitemap_lastmod.pop(url, None))
+
+    def closed(self, reason):
+        stats = self.crawler.stats
+        fetched = stats.get_value("sitemap/product_urls/fetched", 0)
+        skipped = stats.get_value("sitemap/product_urls/skipped", 0)
+        self.logger.info(
+            f"Sitemap product URLs: {fetched} fetched, {skipped} skipped as unchanged"
+        )
+        if self.crawl_state is not None:
+            self.crawl_state.close()
+
+    def _parse_sitemap(self, response):
         """
-        For every URL found in the sitemap, attach custom headers.
+        Streams sitemap entries instead of parsing the whole document first;
+        every request (nested sitemap or product) gets the custom headers.
         """
-        for req in super()._requests_to_follow(response):
-            req = req.replace(headers=self.custom_headers)
-            yield req
+        if response.url.endswith("/robots.txt"):
+            for request in super()._parse_sitemap(response):
+                yield request.replace(headers=self.custom_headers)
+            return
+
+        max_size = response.meta.get("download_maxsize", self._max_size)
+        source = open_sitemap_body(response, max_size=max_size)
+        try:
+            sitemap = StreamingSitemap(source) if source is not None else None
+            if sitemap is None or sitemap.type not in ("sitemapindex", "urlset"):
+                self.logger.warning(f"Ignoring invalid sitemap: {response}")
+                return
+
+            entries = self.sitemap_filter(sitemap)
+            if sitemap.type == "sitemapindex":
+                for loc in self._get_urls_from_sitemapindex(entries):
+                    yield scrapy.Request(
+                        loc, headers=self.custom_headers, callback=self._parse_sitemap
+                    )
+            else:
+                for loc, callback in self._get_urls_and_callbacks_from_urlset(entries):
+                    yield scrapy.Request(
+                        loc, headers=self.custom_headers, callback=callback
+                    )
+        except (SitemapTooLarge, OSError, EOFError, etree.XMLSyntaxError) as e:
+            # Requests yielded so far stay scheduled
+            self.logger.warning(f"Stopped reading sitemap {response.url}: {e}")
 
     def extract_cover_url(self, response):
         """
@@ -77,7 +223,23 @@ class ChitaiGorodSitemapSpider(SitemapSpider):
         Main parsing function: extracts all book fields from the product page.
         """
         self.logger.info(f"Parsing book page: {response.url}")
-        item = BookScraperItem()
+        if self.extraction_mode == "structured":
+            fields = extract_book(response.selector.root)
+        else:
+            fields = self.extract_fields_xpath(response)
+        item = BookScraperItem(**fields)
+
+        # --- Source page URL ---
+        item["source_url"] = response.url
+
+        self.record_fetched(response)
+        yield item
+
+    def extract_fields_xpath(self, response):
+        """
+        Default extraction (extraction_mode=xpath): one XPath query per field.
+        """
+        item = {}
 
         # --- Title ---
         item["title"] = response.xpath("//h1[@itemprop='name']/text()").get(
@@ -135,7 +297,4 @@ class ChitaiGorodSitemapSpider(SitemapSpider):
         # --- Book cover URL ---
         item["book_cover"] = self.extract_cover_url(response)
 
-        # --- Source page URL ---
-        item["source_url"] = response.url
-
-        yield item
+        return item
@@ -0,0 +1,181 @@
+# hw2/books_backends.py
+
+"""
+Storage backends for the books API ISBN lookups.
+
+- MongoBooksBackend: the books collection (one $in query per lookup batch).
+- JsonlBooksBackend: a feed export such as books_export.jsonl, served
+  without MongoDB. The file is memory-mapped and an ISBN -> (offset, length)
+  index is built once and persisted next to it (<file>.idx); a lookup only
+  slices and decodes the matching line. An unreadable or corrupt index is
+  rebuilt; if it can't be written (read-only directory), it is kept in
+  memory only.
+
+Both return {normalized ISBN: serialized book JSON (bytes)} from
+load_books(), so the API code does not depend on the backend.
+Selected with the BOOKS_BACKEND environment variable (mongo | file).
+"""
+
+import json
+import logging
+import mmap
+import os
+import tempfile
+
+from book_scraper.isbn import normalize_isbn
+
+logger = logging.getLogger(__name__)
+
+
+class MongoBooksBackend:
+    name = "mongo"
+
+    def __init__(self, collection, projection, encode):
+        self.collection = collection
+        self.projection = projection
+        self.encode = encode
+
+    async def load_books(self, isbns):
+        """
+        Loads books with a single $in query; `isbns` maps normalized key -> ISBN
+        as requested. Older documents without isbn_normalized are still
+        matched by their raw ISBN (run backfill_isbn_normalized.py once to
+        give them the key). Empty keys never match, so books stored without
+        an ISBN can't be returned for an invalid one.
+        """
+        isbns = {key: isbn for key, isbn in isbns.items() if key}
+        if not isbns:
+            return {}
+        query = {
+            "$or": [
+                {"isbn_normalized": {"$in": list(isbns)}},
+                {"isbn": {"$in": [isbn for isbn in isbns.values() if isbn]}},
+            ]
+        }
+        if len(isbns) == 1:
+            # Single lookup: find_one avoids cursor setup
+            doc = await self.collection.find_one(query, self.projection)
+            docs = [doc] if doc else []
+        else:
+            docs = self.collection.find(query, self.projection)
+            docs = await docs.to_list(length=None)
+        books = {}
+        for doc in docs:
+            key = doc.pop("isbn_normalized", None) or normalize_isbn(doc.get("isbn"))
+            if key in isbns:
+                books.setdefault(key, self.encode(doc))
+        return books
+
+    def close(self):
+        pass
+
+
+class JsonlBooksBackend:
+    name = "file"
+
+    INDEX_VERSION = 2
+
+    def __init__(self, path, fields, encode, index_path=None):
+        self.path = path
+        self.fields = fields
+        self.encode = encode
+        self.index_path = index_path or f"{path}.idx"
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        # mmap can't map an empty file
+        self.data = (
+            mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        )
+        self.index = self.load_index() or self.build_index()
+
+    def file_signature(self):
+        stat = os.stat(self.path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def load_index(self):
+        """Returns the persisted index if it matches the current file, else None."""
+        if not os.path.exists(self.index_path):
+            return None
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                books = header.pop("books", None) if isinstance(header, dict) else None
+                if header != {"version": self.INDEX_VERSION, **self.file_signature()}:
+                    logger.info(f"Index {self.index_path} is stale, rebuilding")
+                    return None
+                index = {}
+                for line in f:
+                    key, offset, length = line.rstrip("\n").split("\t")
+                    index[key] = (int(offset), int(length))
+            if len(index) != books:
+                raise ValueError(f"{len(index)} entries, header says {books}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Can't read index {self.index_path}, rebuilding: {e}")
+            return None
+        logger.info(f"Loaded ISBN index with {len(index)} books from {self.index_path}")
+        return index
+
+    def build_index(self):
+        """Scans the file once and persists normalized ISBN -> (offset, length)."""
+        index = {}
+        offset = 0
+        size = len(self.data)
+        while offset < size:
+            end = self.data.find(b"\n", offset)
+            if end == -1:
+                end = size
+            line = self.data[offset:end]
+            if line.strip():
+                isbn = json.loads(line).get("isbn")
+                key = normalize_isbn(isbn)
+                if key:
+                    index.setdefault(key, (offset, end - offset))  # first one wins
+            offset = end + 1
+        logger.info(f"Built ISBN index with {len(index)} books")
+        self.save_index(index)
+        return index
+
+    def save_index(self, index):
+        """Writes the index atomically; on failure it is only kept in memory."""
+        header = {
+            "version": self.INDEX_VERSION,
+            **self.file_signature(),
+            "books": len(index),
+        }
+        tmp_path = None
+        try:
+            # Own temp file: several API workers may build the index at once
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(self.index_path)),
+                prefix=os.path.basename(self.index_path) + ".",
+                suffix=".tmp",
+            )
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(json.dumps(header) + "\n")
+                for key, (line_offset, length) in index.items():
+                    f.write(f"{key}\t{line_offset}\t{length}\n")
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning(
+                f"Can't save index {self.index_path}, keeping it in memory: {e}"
+            )
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        logger.info(f"Saved ISBN index to {self.index_path}")
+
+    async def load_books(self, isbns):
+        books = {}
+        for key in isbns:
+            position = self.index.get(key)
+            if position is None:
+                continue
+            offset, length = position
+            doc = json.loads(self.data[offset : offset + length])
+            books[key] = self.encode({f: doc[f] for f in self.fields if f in doc})
+        return books
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
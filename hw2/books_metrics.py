@@ -0,0 +1,277 @@
+# hw2/books_metrics.py
+
+"""
+Prometheus-style metrics for the books API (text exposition format 0.0.4).
+
+- Histogram: minimal labelled histogram (buckets, sum, count).
+- MongoCommandMetrics: pymongo CommandListener, round-trip time of every
+  command the driver sends, by command name and outcome.
+- MongoPoolMetrics: pymongo ConnectionPoolListener, open/checked-out
+  connections, pool size limit and checkout wait time per server.
+- BooksMetrics: the registry rendered by GET /metrics; cache counters are
+  read from the TTLCache at scrape time.
+- RequestLatencyMiddleware: pure ASGI middleware feeding the request latency
+  histogram; times the whole response, body included (streamed /export too).
+
+Listeners are called from the driver's threads, so updates take a lock.
+"""
+
+import threading
+import time
+
+from pymongo import monitoring
+
+# Seconds; API handlers and Mongo round-trips are mostly sub-millisecond to tens of ms
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        with self.lock:
+            series = self.series.get(labelvalues)
+            if series is None:
+                series = self.series[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for labelvalues, series in sorted(self.series.items()):
+                labels = list(zip(self.labelnames, labelvalues))
+                for bound, count in zip(self.buckets, series):
+                    bucket_labels = format_labels(labels + [("le", bound)])
+                    lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+                inf_labels = format_labels(labels + [("le", "+Inf")])
+                lines.append(f"{self.name}_bucket{inf_labels} {series[-1]}")
+                lines.append(f"{self.name}_sum{format_labels(labels)} {series[-2]!r}")
+                lines.append(f"{self.name}_count{format_labels(labels)} {series[-1]}")
+        return lines
+
+
+def render_metric(name, kind, help, samples):
+    """Lines for a counter/gauge; `samples` is [(labels, value), ...]."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+    return lines
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self.rtt = Histogram(
+            "books_mongo_command_duration_seconds",
+            "MongoDB command round-trip time as seen by the driver.",
+            ("command", "outcome"),
+        )
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.rtt.observe(event.duration_micros / 1e6, event.command_name, "success")
+
+    def failed(self, event):
+        self.rtt.observe(event.duration_micros / 1e6, event.command_name, "failure")
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.max_size = {}  # address -> maxPoolSize
+        self.open = {}
+        self.checked_out = {}
+        self.checkout_failures = {}
+        self.checkout_wait = Histogram(
+            "books_mongo_pool_checkout_wait_seconds",
+            "Time spent waiting for a pooled connection.",
+            ("address",),
+        )
+
+    def add(self, counter, event, delta=1):
+        address = "%s:%s" % event.address
+        with self.lock:
+            counter[address] = counter.get(address, 0) + delta
+
+    def pool_created(self, event):
+        with self.lock:
+            self.max_size["%s:%s" % event.address] = event.options.get(
+                "maxPoolSize", 100
+            )
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.add(self.open, event)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.add(self.open, event, -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.add(self.checkout_failures, event)
+
+    def connection_checked_out(self, event):
+        self.add(self.checked_out, event)
+        duration = getattr(event, "duration", None)  # pymongo >= 4.7
+        if duration is not None:
+            self.checkout_wait.observe(duration, "%s:%s" % event.address)
+
+    def connection_checked_in(self, event):
+        self.add(self.checked_out, event, -1)
+
+    def render(self):
+        with self.lock:
+            addresses = sorted(self.max_size.keys() | self.open.keys())
+            utilization = [
+                (
+                    [("address", a)],
+                    round(self.checked_out.get(a, 0) / self.max_size[a], 4)
+                    if self.max_size.get(a)
+                    else 0.0,
+                )
+                for a in addresses
+            ]
+            lines = (
+                render_metric(
+                    "books_mongo_pool_max_size", "gauge",
+                    "Configured maxPoolSize.",
+                    [([("address", a)], self.max_size.get(a, 0)) for a in addresses],
+                )
+                + render_metric(
+                    "books_mongo_pool_connections", "gauge",
+                    "Open pooled connections.",
+                    [([("address", a)], self.open.get(a, 0)) for a in addresses],
+                )
+                + render_metric(
+                    "books_mongo_pool_checked_out", "gauge",
+                    "Connections currently in use.",
+                    [([("address", a)], self.checked_out.get(a, 0)) for a in addresses],
+                )
+                + render_metric(
+                    "books_mongo_pool_utilization", "gauge",
+                    "Connections in use / maxPoolSize.",
+                    utilization,
+                )
+                + render_metric(
+                    "books_mongo_pool_checkout_failures_total", "counter",
+                    "Failed connection checkouts (timeouts, pool closed, errors).",
+                    [
+                        ([("address", a)], self.checkout_failures.get(a, 0))
+                        for a in addresses
+                    ],
+                )
+            )
+        return lines + self.checkout_wait.render()
+
+
+class BooksMetrics:
+    def __init__(self, cache):
+        self.cache = cache
+        self.requests = Histogram(
+            "books_http_request_duration_seconds",
+            "API request latency.",
+            ("method", "route", "status"),
+        )
+        self.mongo_commands = MongoCommandMetrics()
+        self.mongo_pool = MongoPoolMetrics()
+
+    @property
+    def listeners(self):
+        """pymongo event_listeners for the Mongo client."""
+        return [self.mongo_commands, self.mongo_pool]
+
+    def render(self):
+        stats = self.cache.stats()
+        lines = self.requests.render()
+        lines += self.mongo_commands.rtt.render()
+        lines += self.mongo_pool.render()
+        for name, kind, key, help in (
+            ("books_cache_hits_total", "counter", "hits", "Book cache hits."),
+            ("books_cache_misses_total", "counter", "misses", "Book cache misses."),
+            ("books_cache_evictions_total", "counter", "evictions", "LRU evictions."),
+            ("books_cache_size", "gauge", "size", "Cached entries."),
+            ("books_cache_max_size", "gauge", "maxsize", "Cache capacity."),
+            ("books_cache_hit_ratio", "gauge", "hit_rate", "Hits / lookups since start."),
+        ):
+            lines += render_metric(name, kind, help, [([], stats[key])])
+        return "\n".join(lines) + "\n"
+
+
+class RequestLatencyMiddleware:
+    """
+    Observes every HTTP request into a (method, route, status) histogram.
+
+    Plain ASGI instead of @app.middleware("http"): BaseHTTPMiddleware runs
+    each response through an extra task and memory stream, which costs more
+    than the fast handlers themselves, and only times it up to the headers.
+    """
+
+    def __init__(self, app, histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Route template, not the raw path, to keep label cardinality bounded;
+            # the router stores the matched route in the shared scope
+            route = scope.get("route")
+            self.histogram.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route.path if route else "unmatched",
+                status,
+            )
@@ -1,8 +1,41 @@
-from fastapi import FastAPI, HTTPException, Query
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from bson import ObjectId
 from pydantic import BaseModel
-from typing import Optional
+from pymongo.errors import OperationFailure, PyMongoError
+from typing import List, Optional
+import asyncio
+import base64
+import json
+import logging
+import os
+import re
 import motor.motor_asyncio
 
+from book_scraper.indexes import BOOK_INDEXES
+from book_scraper.isbn import normalize_isbn
+from books_backends import JsonlBooksBackend, MongoBooksBackend
+from books_cache import MISSING, TTLCache
+from books_metrics import BooksMetrics, RequestLatencyMiddleware
+
+try:
+    import orjson
+
+    def dumps(value):
+        return orjson.dumps(value)
+
+except ImportError:  # fall back to the stdlib encoder
+
+    def dumps(value):
+        return json.dumps(
+            value, ensure_ascii=False, separators=(",", ":"), default=str
+        ).encode()
+
+
+logger = logging.getLogger(__name__)
+
 
 class Book(BaseModel):
     title: str
@@ -20,21 +53,464 @@ class Book(BaseModel):
     source_url: str
 
 
+# Only the fields the API returns; documents are already typed by the pipeline,
+# so they are serialized as is, without a Pydantic validation pass
+BOOK_PROJECTION = {
+    "_id": 0,
+    "isbn_normalized": 1,
+    **{field: 1 for field in Book.model_fields},
+}
+
+
+class SearchResponse(BaseModel):
+    items: List[Book]
+    next_cursor: Optional[str] = None
+
+
+class IsbnBatchRequest(BaseModel):
+    isbns: List[str]
+
+
+class IsbnBatchResult(BaseModel):
+    isbn: str
+    book: Optional[Book] = None
+
+
+class IsbnBatchResponse(BaseModel):
+    results: List[IsbnBatchResult]
+    not_found: List[str]
+
+
+BOOKS_BACKEND = os.getenv("BOOKS_BACKEND", "mongo")
+
+MONGO_URI = os.getenv("BOOKS_MONGO_URI", "mongodb://localhost:27017")
+MONGO_DATABASE = os.getenv("BOOKS_MONGO_DATABASE", "books")
+MONGO_COLLECTION = os.getenv("BOOKS_MONGO_COLLECTION", "books")
+
+# Pool sizing and timeouts (ms); pool size is per worker process
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": int(os.getenv("BOOKS_MONGO_MAX_POOL_SIZE", "100")),
+    "minPoolSize": int(os.getenv("BOOKS_MONGO_MIN_POOL_SIZE", "0")),
+    "maxIdleTimeMS": int(os.getenv("BOOKS_MONGO_MAX_IDLE_TIME_MS", "60000")),
+    "waitQueueTimeoutMS": int(os.getenv("BOOKS_MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000")),
+    "serverSelectionTimeoutMS": int(
+        os.getenv("BOOKS_MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")
+    ),
+    "connectTimeoutMS": int(os.getenv("BOOKS_MONGO_CONNECT_TIMEOUT_MS", "5000")),
+    "socketTimeoutMS": int(os.getenv("BOOKS_MONGO_SOCKET_TIMEOUT_MS", "10000")),
+    "readPreference": os.getenv("BOOKS_MONGO_READ_PREFERENCE", "primary"),
+}
+
+# Set up by lifespan(): one client/backend per worker process
+client = None
+collection = None
+books_backend = None
+
+# Read-through cache of serialized book JSON (bytes) by normalized ISBN
+# (size 0 disables it)
+book_cache = TTLCache(
+    maxsize=int(os.getenv("BOOKS_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("BOOKS_CACHE_TTL", "300")),
+    negative_ttl=float(os.getenv("BOOKS_CACHE_NEGATIVE_TTL", "30")),
+)
+
+# Max number of ISBNs in one /search_by_isbn/batch request
+BATCH_MAX_ISBNS = int(os.getenv("BOOKS_BATCH_MAX_ISBNS", "500"))
+
+metrics = BooksMetrics(book_cache)
+
+
+def create_backend(backend):
+    """ISBN lookup backend: "mongo" (default) or "file"."""
+    if backend == "mongo":
+        return MongoBooksBackend(collection, BOOK_PROJECTION, dumps)
+    if backend == "file":
+        path = os.getenv(
+            "BOOKS_JSONL_PATH",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "books_export.jsonl"),
+        )
+        return JsonlBooksBackend(path, list(Book.model_fields), dumps)
+    raise ValueError(f"BOOKS_BACKEND must be 'mongo' or 'file', got {backend!r}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global client, collection, books_backend
+    change_listener = None
+    if BOOKS_BACKEND == "mongo":
+        client = motor.motor_asyncio.AsyncIOMotorClient(
+            MONGO_URI, event_listeners=metrics.listeners, **MONGO_CLIENT_OPTIONS
+        )
+        collection = client[MONGO_DATABASE][MONGO_COLLECTION]
+    books_backend = create_backend(BOOKS_BACKEND)
+    if books_backend.name == "mongo":
+        try:
+            await ensure_indexes()
+        except PyMongoError as e:
+            # Start anyway; /ready reports 503 until MongoDB is reachable
+            logger.error(f"Can't check indexes, MongoDB unavailable: {e}")
+        change_listener = asyncio.create_task(watch_book_changes())
+    try:
+        yield
+    finally:
+        if change_listener is not None:
+            change_listener.cancel()
+        books_backend.close()
+        if client is not None:
+            client.close()
+
+
 app = FastAPI(
     title="Book ISBN Search Service",
     description="Study Case Example",
+    lifespan=lifespan,
 )
 
-# Одно соединение на всё приложение
-client = motor.motor_asyncio.AsyncIOMotorClient("mongodb://localhost:27017")
-mongo_db = client["books"]
-collection = mongo_db["books"]
+
+app.add_middleware(RequestLatencyMiddleware, histogram=metrics.requests)
+
+
+def require_mongo():
+    if books_backend.name != "mongo":
+        raise HTTPException(
+            status_code=501, detail=f"Not supported by the {books_backend.name} backend"
+        )
+
+
+async def ensure_indexes():
+    """Creates the books indexes (idempotent) and logs any that are missing."""
+    for index in BOOK_INDEXES:
+        try:
+            await collection.create_indexes([index])
+        except OperationFailure as e:
+            logger.error(f"Can't create index {index.document['name']}: {e}")
+    existing = await collection.index_information()
+    for index in BOOK_INDEXES:
+        if index.document["name"] not in existing:
+            logger.warning(f"Missing index {index.document['name']} on books")
+
+
+async def watch_book_changes():
+    """
+    Invalidates cached books when the crawler changes them.
+    Needs a replica set; on a standalone server only the TTL applies.
+    """
+    try:
+        async with collection.watch(full_document="updateLookup") as stream:
+            async for change in stream:
+                isbn = (change.get("fullDocument") or {}).get("isbn")
+                if isbn and change["operationType"] in ("insert", "update", "replace"):
+                    book_cache.invalidate(normalize_isbn(isbn))
+                else:
+                    # Deletes etc. don't carry the ISBN: drop everything
+                    book_cache.invalidate()
+    except PyMongoError as e:
+        logger.info(f"Change streams unavailable, cache relies on TTL only: {e}")
 
 
 @app.get("/search_by_isbn", response_model=Book, tags=["ISBN Searcher"])
 async def get_book_by_isbn(isbn: str = Query(..., description="Book ISBN")):
-    result = await collection.find_one({"isbn": isbn})
-    if not result:
+    key = normalize_isbn(isbn)
+    if not key:
+        # No digits at all: never matches, and books without an ISBN must not
+        raise HTTPException(status_code=404, detail="Can't find book with this ISBN")
+    payload = book_cache.get(key)
+    if payload is MISSING:
+        payload = (await books_backend.load_books({key: isbn})).get(key)
+        book_cache.set(key, payload)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Can't find book with this ISBN")
-    result.pop("_id", None)  # MongoDB stores _id, Pydantic doesn't expect it
-    return Book(**result)
+    # Pre-serialized bytes: response_model is for the OpenAPI schema only
+    return Response(content=payload, media_type="application/json")
+
+
+@app.post(
+    "/search_by_isbn/batch", response_model=IsbnBatchResponse, tags=["ISBN Searcher"]
+)
+async def get_books_by_isbn_batch(request: IsbnBatchRequest):
+    """
+    Resolves many ISBNs with one query. Results keep the input order;
+    ISBN-10/13 and hyphenated variants of the same book resolve to it.
+    """
+    if len(request.isbns) > BATCH_MAX_ISBNS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Too many ISBNs: {len(request.isbns)} > {BATCH_MAX_ISBNS}",
+        )
+
+    found = {}
+    misses = {}
+    for isbn in request.isbns:
+        key = normalize_isbn(isbn)
+        if key in found or key in misses:
+            continue
+        if not key:
+            found[key] = None  # not an ISBN, reported in not_found
+            continue
+        payload = book_cache.get(key)
+        if payload is MISSING:
+            misses[key] = isbn
+        else:
+            found[key] = payload
+
+    if misses:
+        loaded = await books_backend.load_books(misses)
+        for key in misses:
+            found[key] = loaded.get(key)
+            book_cache.set(key, found[key])
+
+    # Splice the cached per-book JSON fragments instead of re-encoding them
+    results = []
+    not_found = []
+    for isbn in request.isbns:
+        payload = found[normalize_isbn(isbn)]
+        if payload is None:
+            not_found.append(isbn)
+        results.append(b'{"isbn":%s,"book":%s}' % (dumps(isbn), payload or b"null"))
+    body = b'{"results":[%s],"not_found":%s}' % (b",".join(results), dumps(not_found))
+    return Response(content=body, media_type="application/json")
+
+
+# /search order per mode: (field, _id), each backed by a (field, _id) index
+SEARCH_PREFIX_FIELDS = ("title", "author")
+SEARCH_RANGE_FIELDS = ("publication_year", "price_amount")
+
+
+@app.get("/search", response_model=SearchResponse, tags=["Book Search"])
+async def search_books(
+    q: Optional[str] = Query(None, description="Title/author prefix or text query"),
+    match: str = Query("prefix", pattern="^(prefix|text)$"),
+    field: str = Query(
+        "title", pattern="^(title|author)$", description="Field of a prefix match"
+    ),
+    publisher: Optional[str] = Query(None),
+    year_from: Optional[int] = Query(None),
+    year_to: Optional[int] = Query(None),
+    price_min: Optional[int] = Query(None),
+    price_max: Optional[int] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    """
+    Searches books by title/author prefix and filters, with keyset pagination.
+
+    - The order is (key, _id), where key is the field that bounds the index
+      scan: `field` (title or author) for a prefix match, else publication_year
+      or price_amount for a range filter, else none (_id only, also for the
+      publisher equality filter). Each has a (key, _id) index and next_cursor
+      carries both values, so every page starts right at the cursor in the
+      index: deep pages cost the same as the first.
+    - match=text: full-text search (title_author_text), best matches first.
+      Relevance order can't be resumed from a cursor, so text search returns
+      a single page of at most `limit` books and rejects a cursor.
+    """
+    require_mongo()
+    query = {}
+    order_field = None
+    if publisher:
+        query["publisher"] = publisher
+    if year_from is not None or year_to is not None:
+        query["publication_year"] = range_filter(year_from, year_to)
+    if price_min is not None or price_max is not None:
+        query["price_amount"] = range_filter(price_min, price_max)
+    for range_field in SEARCH_RANGE_FIELDS:
+        if range_field in query:
+            order_field = range_field
+            break
+
+    projection = {name: 1 for name in Book.model_fields}  # _id is included
+    if q and match == "text":
+        if cursor:
+            raise HTTPException(
+                status_code=400, detail="Text search returns a single page, no cursor"
+            )
+        query["$text"] = {"$search": q}
+        projection["score"] = {"$meta": "textScore"}
+        docs = await (
+            collection.find(query, projection)
+            .sort([("score", {"$meta": "textScore"}), ("_id", 1)])
+            .limit(limit)
+        ).to_list(length=limit)
+        return search_page(docs, limit, None)
+
+    if q:
+        order_field = field
+        query[field] = {"$regex": f"^{re.escape(q)}"}
+    if cursor:
+        try:
+            cursor_field, value, object_id = decode_search_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if cursor_field != order_field:
+            raise HTTPException(status_code=400, detail="Cursor is for another query")
+        if order_field is None:
+            query["_id"] = {"$gt": object_id}
+        else:
+            query = {"$and": [query, keyset_after(order_field, value, object_id)]}
+
+    sort = [("_id", 1)] if order_field is None else [(order_field, 1), ("_id", 1)]
+    docs = await (
+        collection.find(query, projection).sort(sort).limit(limit + 1)
+    ).to_list(length=limit + 1)
+    return search_page(docs, limit, order_field)
+
+
+def search_page(docs, limit, order_field):
+    next_cursor = None
+    if len(docs) > limit:
+        last = docs[limit - 1]
+        value = last.get(order_field) if order_field else None
+        next_cursor = encode_search_cursor(order_field, value, last["_id"])
+    items = []
+    for doc in docs[:limit]:
+        doc.pop("_id")
+        doc.pop("score", None)
+        items.append(dumps(doc))
+    body = b'{"items":[%s],"next_cursor":%s}' % (b",".join(items), dumps(next_cursor))
+    return Response(content=body, media_type="application/json")
+
+
+def encode_search_cursor(order_field, value, object_id):
+    raw = json.dumps([order_field, value, str(object_id)], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_search_cursor(token):
+    try:
+        order_field, value, object_id = json.loads(
+            base64.urlsafe_b64decode(token.encode())
+        )
+        if order_field not in (None, *SEARCH_PREFIX_FIELDS, *SEARCH_RANGE_FIELDS):
+            raise ValueError(f"unknown order field {order_field!r}")
+        return order_field, value, ObjectId(object_id)
+    except Exception as e:
+        raise ValueError(f"Invalid search cursor: {e}")
+
+
+@app.get("/export", tags=["Export"])
+async def export_books(
+    updated_since: Optional[datetime] = Query(
+        None, description="Only books whose content changed at/after this time"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="_cursor of the last line received, to resume"
+    ),
+    batch_size: int = Query(500, ge=1, le=5000),
+):
+    """
+    Streams the books collection as NDJSON, ordered by (updated_at, _id).
+
+    Memory stays bounded by one cursor batch. Every line carries a _cursor
+    token; after a disconnect, pass the last one received to continue.
+    """
+    require_mongo()
+    conditions = []
+    if updated_since is not None:
+        conditions.append({"updated_at": {"$gte": updated_since}})
+    if cursor:
+        try:
+            updated_at, object_id = decode_export_cursor(cursor)
+            conditions.append(keyset_after("updated_at", updated_at, object_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    query = {"$and": conditions} if conditions else {}
+
+    projection = {"updated_at": 1, **{field: 1 for field in Book.model_fields}}
+    docs = (
+        collection.find(query, projection)
+        .sort([("updated_at", 1), ("_id", 1)])
+        .batch_size(batch_size)
+    )
+
+    async def ndjson_lines():
+        chunk = []
+        async for doc in docs:
+            doc["_cursor"] = encode_export_cursor(doc.get("updated_at"), doc.pop("_id"))
+            chunk.append(dumps(doc))
+            if len(chunk) >= batch_size:
+                yield b"\n".join(chunk) + b"\n"
+                chunk = []
+        if chunk:
+            yield b"\n".join(chunk) + b"\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+def encode_export_cursor(updated_at, object_id):
+    raw = json.dumps([updated_at.isoformat() if updated_at else None, str(object_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_export_cursor(token):
+    try:
+        updated_at, object_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+        updated_at = datetime.fromisoformat(updated_at) if updated_at else None
+        return updated_at, ObjectId(object_id)
+    except Exception as e:
+        raise ValueError(f"Invalid export cursor: {e}")
+
+
+def keyset_after(field, value, object_id):
+    """Documents strictly after (value, _id) in (field, _id) order (nulls first)."""
+    if value is None:
+        return {
+            "$or": [
+                {field: None, "_id": {"$gt": object_id}},
+                {field: {"$ne": None}},
+            ]
+        }
+    return {
+        "$or": [
+            {field: {"$gt": value}},
+            {field: value, "_id": {"$gt": object_id}},
+        ]
+    }
+
+
+def range_filter(low, high):
+    condition = {}
+    if low is not None:
+        condition["$gte"] = low
+    if high is not None:
+        condition["$lte"] = high
+    return condition
+
+
+@app.post("/cache/invalidate", tags=["Cache"])
+async def invalidate_cache(
+    isbn: Optional[str] = Query(None, description="ISBN to drop, all if omitted")
+):
+    """Invalidation hook, e.g. for a crawler run without change streams."""
+    book_cache.invalidate(normalize_isbn(isbn) if isbn else None)
+    return {"invalidated": isbn or "all"}
+
+
+@app.get("/cache/stats", tags=["Cache"])
+async def cache_stats():
+    return book_cache.stats()
+
+
+@app.get("/health", tags=["Service"])
+async def health():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/ready", tags=["Service"])
+async def ready():
+    """Readiness: the backend can answer lookups (MongoDB responds to ping)."""
+    if books_backend is None:
+        raise HTTPException(status_code=503, detail="Backend not initialized")
+    if books_backend.name == "mongo":
+        try:
+            await client.admin.command("ping")
+        except PyMongoError as e:
+            raise HTTPException(status_code=503, detail=f"MongoDB unavailable: {e}")
+    return {"status": "ready", "backend": books_backend.name}
+
+
+@app.get("/metrics", tags=["Service"], include_in_schema=False)
+async def prometheus_metrics():
+    return Response(
+        content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
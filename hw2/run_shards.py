@@ -0,0 +1,183 @@
+# hw2/run_shards.py
+
+"""
+Runs ChitaiGorodSitemapSpider as N hash shards in parallel processes.
+
+- Shard i runs with -a shard_index=i -a shard_count=N in its own process
+  (own reactor, own core); shards share nothing but the sitemap.
+- Each shard's Scrapy stats are returned to the launcher and merged:
+  counters are summed; */max, *_max, gauges (last value seen, e.g.
+  mongodb/queue_depth) and times take the extreme; averages and ratios are
+  recomputed from the shards' counts; other values (e.g. finish_reason)
+  become a list when shards disagree.
+- Per-shard feeds: pass --feed "books-%(shard_index)s.jsonl" (spider
+  attributes are substituted in feed URIs).
+
+Run from hw2/ (the repository root must be on PYTHONPATH, see scrapy.cfg):
+    PYTHONPATH=.. python run_shards.py --shards 4 [-a incremental=1]
+        [-s LOG_LEVEL=WARNING] [--feed "books-%(shard_index)s.jsonl"]
+        [--output stats.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from datetime import datetime
+
+HW2 = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_shard(spider_name, shard_index, shard_count, spider_args, settings, feed):
+    """Runs one shard to completion and returns its stats (runs in a child process)."""
+    os.chdir(HW2)
+    sys.path.insert(0, HW2)
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "book_scraper.settings")
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    project_settings = get_project_settings()
+    project_settings.update(settings, priority="cmdline")
+    if feed:
+        project_settings.set("FEEDS", {feed: {"format": "jsonlines"}}, priority="cmdline")
+    process = CrawlerProcess(project_settings)
+    crawler = process.create_crawler(spider_name)
+    process.crawl(
+        crawler, shard_index=shard_index, shard_count=shard_count, **spider_args
+    )
+    process.start()
+    return crawler.stats.get_stats()
+
+
+# Point-in-time values: summing them across shards means nothing
+GAUGES = {
+    "elapsed_time_seconds",
+    "memusage/startup",
+    "mongodb/queue_depth",
+    "mongodb/write_latency_ms",
+}
+
+
+def is_extreme(key):
+    return key.endswith(("_max", "/max")) or key in GAUGES
+
+
+def weighted_average(all_stats, key, weight_key):
+    """Average of a per-shard average, weighted by each shard's count."""
+    total = weight = 0
+    for stats in all_stats:
+        if key in stats and stats.get(weight_key):
+            total += stats[key] * stats[weight_key]
+            weight += stats[weight_key]
+    return round(total / weight, 1) if weight else None
+
+
+def hit_ratio(merged):
+    served = merged.get("httpcache/hit", 0) + merged.get("httpcache/not_modified", 0)
+    downloaded = merged.get("httpcache/firsthand", 0) + merged.get(
+        "httpcache/invalidate", 0
+    )
+    if served + downloaded:
+        return round(served / (served + downloaded), 4)
+    return None
+
+
+def merge_stats(all_stats):
+    merged = {}
+    for stats in all_stats:
+        for key, value in stats.items():
+            if key not in merged:
+                merged[key] = value
+            elif isinstance(value, datetime):
+                pick = min if key == "start_time" else max
+                merged[key] = pick(merged[key], value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                if is_extreme(key):
+                    merged[key] = max(merged[key], value)
+                else:
+                    merged[key] += value
+            elif value != merged[key]:
+                values = merged[key] if isinstance(merged[key], list) else [merged[key]]
+                if value not in values:
+                    values.append(value)
+                merged[key] = values
+
+    # Derived values, recomputed from the merged counters instead of summed
+    derived = {
+        "mongodb/write_latency_ms_avg": weighted_average(
+            all_stats, "mongodb/write_latency_ms_avg", "mongodb/batches"
+        ),
+        "httpcache/hit_ratio": hit_ratio(merged),
+    }
+    for key, value in derived.items():
+        if key not in merged:
+            continue
+        if value is None:
+            del merged[key]
+        else:
+            merged[key] = value
+    return merged
+
+
+def parse_pairs(pairs):
+    result = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        result[key] = value
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--spider", default="chitai_gorod_sitemap")
+    parser.add_argument(
+        "-a", dest="spider_args", action="append", default=[], help="NAME=VALUE"
+    )
+    parser.add_argument(
+        "-s", dest="settings", action="append", default=[], help="NAME=VALUE"
+    )
+    parser.add_argument("--feed", help="per-shard feed URI, may use %%(shard_index)s")
+    parser.add_argument("--output", help="write per-shard and merged stats JSON here")
+    args = parser.parse_args()
+
+    spider_args = parse_pairs(args.spider_args)
+    settings = parse_pairs(args.settings)
+    # A fresh interpreter per shard: Twisted reactors can't be restarted or forked
+    context = multiprocessing.get_context("spawn")
+    pool = context.Pool(processes=args.shards)
+    try:
+        all_stats = pool.starmap(
+            run_shard,
+            [
+                (args.spider, i, args.shards, spider_args, settings, args.feed)
+                for i in range(args.shards)
+            ],
+        )
+    finally:
+        # close + join, not terminate (what `with Pool` does): a worker that has
+        # run a crawl keeps Scrapy's SIGTERM handler and would never exit
+        pool.close()
+        pool.join()
+
+    result = {
+        "shards": args.shards,
+        "merged": merge_stats(all_stats),
+        "per_shard": all_stats,
+    }
+    text = json.dumps(result, indent=2, ensure_ascii=False, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    merged = result["merged"]
+    print(
+        f"{args.shards} shards: "
+        f"{merged.get('sitemap/product_urls/fetched', 0)} product URLs fetched, "
+        f"{merged.get('sitemap/product_urls/skipped', 0)} skipped, "
+        f"{merged.get('item_scraped_count', 0)} items scraped"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+# hw2/tests/conftest.py
+
+"""
+Pytest setup for the hw2 tests: makes the hw2 modules (books_backends,
+book_scraper, ...) and the repo-level scraping_common package importable
+when pytest runs from the repository root.
+"""
+
+import sys
+from pathlib import Path
+
+for path in Path(__file__).resolve().parents[1:3]:
+    sys.path.insert(0, str(path))
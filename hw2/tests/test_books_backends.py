@@ -0,0 +1,162 @@
+# hw2/tests/test_books_backends.py
+
+"""
+Parity tests of the books API backends (BOOKS_BACKEND=mongo | file).
+
+- The same books are loaded into a mongomock collection (wrapped in a
+  minimal async, motor-like facade) and into a JSONL export, and every case
+  runs against both backends.
+- Covers single lookups by ISBN-13 / ISBN-10 / hyphenated variants, batches
+  mixing hits and misses, unknown ISBNs and invalid input, which must never
+  match a stored book without an ISBN.
+- The file backend also starts with a corrupt <file>.idx (rebuilt) and with
+  a directory it can't write to (index kept in memory).
+"""
+
+import asyncio
+import json
+
+import mongomock
+import pytest
+
+from book_scraper.isbn import normalize_isbn
+from books_backends import JsonlBooksBackend, MongoBooksBackend
+
+FIELDS = ["title", "author", "isbn"]
+
+BOOKS = [
+    {"title": "Кошка", "author": "Дэвид Браннер", "isbn": "5-17-035255-7"},
+    {"title": "Собака", "author": "Иван Петров", "isbn": "978-5-389-07435-4"},
+    {"title": "Без ISBN", "author": "Неизвестен", "isbn": ""},
+]
+
+
+def encode(doc):
+    return json.dumps(doc, ensure_ascii=False, sort_keys=True).encode()
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    async def to_list(self, length=None):
+        return list(self.cursor)
+
+
+class AsyncCollection:
+    """The two motor collection methods MongoBooksBackend uses, over mongomock."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def find_one(self, query, projection):
+        return self.collection.find_one(query, projection)
+
+    def find(self, query, projection):
+        return AsyncCursor(self.collection.find(query, projection))
+
+
+def mongo_backend(tmp_path):
+    collection = mongomock.MongoClient().books.books
+    collection.insert_many(
+        # As stored by BookScraperPipeline
+        [{**book, "isbn_normalized": normalize_isbn(book["isbn"]) or None} for book in BOOKS]
+    )
+    projection = {"_id": 0, "isbn_normalized": 1, **{field: 1 for field in FIELDS}}
+    return MongoBooksBackend(AsyncCollection(collection), projection, encode)
+
+
+def write_export(tmp_path):
+    path = tmp_path / "books_export.jsonl"
+    path.write_text(
+        "".join(json.dumps(book, ensure_ascii=False) + "\n" for book in BOOKS),
+        encoding="utf-8",
+    )
+    return path
+
+
+def file_backend(tmp_path):
+    return JsonlBooksBackend(str(write_export(tmp_path)), FIELDS, encode)
+
+
+@pytest.fixture(params=[mongo_backend, file_backend], ids=["mongo", "file"])
+def backend(request, tmp_path):
+    backend = request.param(tmp_path)
+    yield backend
+    backend.close()
+
+
+def lookup(backend, *isbns):
+    """Runs load_books() like the API does: {normalized key: ISBN as requested}."""
+    books = asyncio.run(backend.load_books({normalize_isbn(i): i for i in isbns}))
+    return {key: json.loads(payload) for key, payload in books.items()}
+
+
+@pytest.mark.parametrize(
+    "isbn", ["5-17-035255-7", "5170352557", "9785170352555", "978-5-17-035255-5"]
+)
+def test_single_lookup_matches_every_variant(backend, isbn):
+    assert lookup(backend, isbn) == {"9785170352555": BOOKS[0]}
+
+
+def test_batch_returns_hits_and_omits_misses(backend):
+    books = lookup(backend, "5-17-035255-7", "9785389074354", "978-0-00-000000-2")
+    assert books == {"9785170352555": BOOKS[0], "9785389074354": BOOKS[1]}
+
+
+@pytest.mark.parametrize("isbn", ["978-0-00-000000-2", "0000000000"])
+def test_unknown_isbn_is_not_found(backend, isbn):
+    assert lookup(backend, isbn) == {}
+
+
+@pytest.mark.parametrize("isbn", ["foo", "", "---"])
+def test_invalid_isbn_never_matches_book_without_isbn(backend, isbn):
+    assert normalize_isbn(isbn) == ""
+    assert lookup(backend, isbn) == {}
+
+
+def test_invalid_isbn_in_batch_does_not_hide_hits(backend):
+    assert lookup(backend, "foo", "5170352557") == {"9785170352555": BOOKS[0]}
+
+
+def corrupt_header(index):
+    index.write_text('{"version": 2, "si', encoding="utf-8")
+
+
+def truncated_entries(index):
+    lines = index.read_text(encoding="utf-8").splitlines(keepends=True)
+    index.write_text("".join(lines[:-1]), encoding="utf-8")
+
+
+@pytest.mark.parametrize("corrupt", [corrupt_header, truncated_entries])
+def test_corrupt_index_is_rebuilt(tmp_path, corrupt):
+    path = write_export(tmp_path)
+    JsonlBooksBackend(str(path), FIELDS, encode).close()
+    index = tmp_path / "books_export.jsonl.idx"
+    valid = index.read_text(encoding="utf-8")
+    corrupt(index)
+
+    backend = JsonlBooksBackend(str(path), FIELDS, encode)
+    try:
+        assert lookup(backend, "5170352557", "9785389074354") == {
+            "9785170352555": BOOKS[0],
+            "9785389074354": BOOKS[1],
+        }
+    finally:
+        backend.close()
+    assert index.read_text(encoding="utf-8") == valid
+
+
+def test_unwritable_directory_keeps_index_in_memory(tmp_path, monkeypatch):
+    path = write_export(tmp_path)
+
+    def read_only(*args, **kwargs):
+        raise PermissionError(13, "Permission denied", str(tmp_path))
+
+    monkeypatch.setattr("books_backends.tempfile.mkstemp", read_only)
+    backend = JsonlBooksBackend(str(path), FIELDS, encode)
+    try:
+        assert lookup(backend, "5-17-035255-7") == {"9785170352555": BOOKS[0]}
+    finally:
+        backend.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["books_export.jsonl"]
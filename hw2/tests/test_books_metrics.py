@@ -0,0 +1,70 @@
+# hw2/tests/test_books_metrics.py
+
+"""
+Tests of RequestLatencyMiddleware, the books API request latency histogram.
+
+- Requests are labelled by route template and the status actually sent.
+- A streamed response is timed until its last body chunk, not its headers.
+"""
+
+import asyncio
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+
+from books_metrics import Histogram, RequestLatencyMiddleware
+
+STREAM_DELAY = 0.05
+
+
+def make_app(histogram):
+    app = FastAPI()
+    app.add_middleware(RequestLatencyMiddleware, histogram=histogram)
+
+    @app.get("/books/{book_id}")
+    async def get_book(book_id: int):
+        if book_id == 0:
+            raise HTTPException(status_code=404)
+        return {"id": book_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            yield b"first\n"
+            await asyncio.sleep(STREAM_DELAY)
+            yield b"last\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+def request(app, path):
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.get(path)
+
+    return asyncio.run(send())
+
+
+def test_labels_by_route_template_and_status():
+    histogram = Histogram("latency", "test", ("method", "route", "status"))
+    app = make_app(histogram)
+    for path in ("/books/1", "/books/2", "/books/0", "/missing"):
+        request(app, path)
+    counts = {labels: series[-1] for labels, series in histogram.series.items()}
+    assert counts == {
+        ("GET", "/books/{book_id}", 200): 2,
+        ("GET", "/books/{book_id}", 404): 1,
+        ("GET", "unmatched", 404): 1,
+    }
+
+
+def test_streamed_response_is_timed_to_the_last_chunk():
+    histogram = Histogram("latency", "test", ("method", "route", "status"))
+    response = request(make_app(histogram), "/stream")
+    assert response.text == "first\nlast\n"
+    series = histogram.series[("GET", "/stream", 200)]
+    assert series[-2] >= STREAM_DELAY
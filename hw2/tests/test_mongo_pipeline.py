@@ -0,0 +1,118 @@
+# hw2/tests/test_mongo_pipeline.py
+
+"""
+Bookkeeping of the shared MongoDB pipeline (scraping_common.mongo), through
+book_scraper's MongoDBPipeline.
+
+- The bulk write itself is not run: batches are handed to batch_done() with
+  the result a writer thread would return, or with the failure it would raise.
+- A fingerprint only counts as stored once its batch was written, so an item
+  from a failed batch is written again when it comes back.
+- Failed batches are counted apart and stay out of the latency average.
+"""
+
+import logging
+
+import mongomock
+from pymongo.errors import AutoReconnect
+from scrapy.utils.test import get_crawler
+from twisted.python.threadpool import ThreadPool
+from twisted.python.failure import Failure
+
+from book_scraper.pipelines import MongoDBPipeline
+
+BOOK = {"title": "Кошка", "author": "Дэвид Браннер", "isbn": "9785170352555"}
+
+
+class FakeSpider:
+    name = "books"
+    logger = logging.getLogger("test_mongo_pipeline")
+
+
+def make_pipeline(stats=None):
+    pipeline = MongoDBPipeline(
+        "mongodb://unused", "books", "books", batch_size=100, stats=stats
+    )
+    pipeline.spider = FakeSpider()
+    pipeline.log_item = lambda data, spider: None
+    return pipeline
+
+
+def hand_over(pipeline):
+    """What flush() does before the write: take the buffer, hold a write slot."""
+    entries, pipeline.buffer = pipeline.buffer, []
+    pipeline.queued_ops += len(entries)
+    pipeline.write_slots.acquire()
+    return entries
+
+
+def written(entries, write_errors=()):
+    details = {
+        "nUpserted": len(entries) - len(write_errors),
+        "nMatched": 0,
+        "nModified": 0,
+        "writeErrors": list(write_errors),
+    }
+    return details, 5.0
+
+
+def test_unchanged_item_is_skipped_after_a_successful_batch():
+    pipeline = make_pipeline()
+    pipeline.process_item(dict(BOOK), FakeSpider())
+    entries = hand_over(pipeline)
+    pipeline.batch_done(written(entries), entries)
+    pipeline.process_item(dict(BOOK), FakeSpider())
+    assert pipeline.buffer == []
+
+
+def test_item_from_a_failed_batch_is_written_again():
+    pipeline = make_pipeline()
+    pipeline.process_item(dict(BOOK), FakeSpider())
+    entries = hand_over(pipeline)
+    pipeline.batch_done(Failure(AutoReconnect("connection lost")), entries)
+    pipeline.process_item(dict(BOOK), FakeSpider())
+    assert len(pipeline.buffer) == 1
+
+
+def test_operation_rejected_in_a_batch_is_written_again():
+    pipeline = make_pipeline()
+    other = {**BOOK, "isbn": "9785389074354"}
+    pipeline.process_item(dict(BOOK), FakeSpider())
+    pipeline.process_item(dict(other), FakeSpider())
+    entries = hand_over(pipeline)
+    error = {"index": 0, "code": 11000, "errmsg": "duplicate key", "op": {}}
+    pipeline.batch_done(written(entries, [error]), entries)
+    pipeline.process_item(dict(BOOK), FakeSpider())
+    pipeline.process_item(dict(other), FakeSpider())
+    assert [key for _, key, _ in pipeline.buffer] == [BOOK["isbn"]]
+
+
+def test_item_with_a_write_in_flight_is_not_skipped():
+    pipeline = make_pipeline()
+    pipeline.process_item(dict(BOOK), FakeSpider())
+    entries = hand_over(pipeline)
+    pipeline.batch_done(written(entries), entries)
+    changed = {**BOOK, "title": "Кошка. Инструкция"}
+    pipeline.process_item(dict(changed), FakeSpider())
+    hand_over(pipeline)  # not written yet
+    # Back to the stored content: must still be written after the pending change
+    pipeline.process_item(dict(BOOK), FakeSpider())
+    assert len(pipeline.buffer) == 1
+
+
+def test_failed_batches_stay_out_of_the_latency_average():
+    stats = get_crawler().stats
+    pipeline = make_pipeline(stats)
+    pipeline.process_item(dict(BOOK), FakeSpider())
+    entries = hand_over(pipeline)
+    pipeline.batch_done(Failure(AutoReconnect("connection lost")), entries)
+    pipeline.process_item(dict(BOOK), FakeSpider())
+    entries = hand_over(pipeline)
+    pipeline.batch_done(written(entries), entries)
+
+    pipeline.threadpool = ThreadPool()
+    pipeline.client = mongomock.MongoClient()
+    pipeline.close_spider(FakeSpider())
+    assert stats.get_value("mongodb/batches") == 1
+    assert stats.get_value("mongodb/batches_failed") == 1
+    assert stats.get_value("mongodb/write_latency_ms_avg") == 5.0
@@ -0,0 +1,164 @@
+# hw2/tests/test_search.py
+
+"""
+Keyset pagination of GET /search against a mongomock collection.
+
+- Walking all pages with next_cursor must return every matching book once,
+  in (order field, _id) order: title/author for prefix matches, year/price
+  for range filters, _id otherwise.
+- A cursor only resumes the kind of query it was issued for; text search
+  is a single page and rejects cursors.
+"""
+
+import asyncio
+import json
+
+import httpx
+import mongomock
+import pytest
+
+import fastapi_service_books as service
+from books_backends import MongoBooksBackend
+
+TITLES = ["Кошка", "Кот", "Собака", "Котёнок", "Книга", "Ключ"]
+AUTHORS = ["Иван Петров", "Анна Котова", "Ким Ли"]
+
+
+def make_books():
+    books = []
+    for i in range(30):
+        books.append(
+            {
+                "title": f"{TITLES[i % len(TITLES)]} {i % 4}",
+                "author": AUTHORS[i % len(AUTHORS)],
+                "publication_year": 2000 + i % 7,
+                "price_amount": 100 + (i * 37) % 500,
+                "publisher": "АСТ" if i % 2 else "Эксмо",
+                "isbn": f"978000000{i:04d}",
+                "source_url": f"https://example.com/{i}",
+            }
+        )
+    return books
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, keys):
+        self.cursor = self.cursor.sort(keys)
+        return self
+
+    def limit(self, count):
+        self.cursor = self.cursor.limit(count)
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.cursor)
+
+
+class AsyncCollection:
+    """The motor collection calls /search makes, over mongomock."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, query, projection):
+        return AsyncCursor(self.collection.find(query, projection))
+
+
+@pytest.fixture
+def books(monkeypatch):
+    collection = mongomock.MongoClient().books.books
+    books = make_books()
+    collection.insert_many([dict(book) for book in books])
+    docs = {doc["isbn"]: doc["_id"] for doc in collection.find()}
+    for book in books:
+        book["_id"] = docs[book["isbn"]]
+    wrapped = AsyncCollection(collection)
+    monkeypatch.setattr(service, "collection", wrapped)
+    monkeypatch.setattr(
+        service,
+        "books_backend",
+        MongoBooksBackend(wrapped, service.BOOK_PROJECTION, service.dumps),
+    )
+    return books
+
+
+def get(params):
+    async def send():
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.get("/search", params=params)
+
+    return asyncio.run(send())
+
+
+def all_pages(params):
+    isbns = []
+    cursor = None
+    while True:
+        response = get({**params, "limit": 4, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        page = json.loads(response.content)
+        isbns += [item["isbn"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return isbns
+
+
+def expected(books, match, order_field):
+    selected = [book for book in books if match(book)]
+    selected.sort(key=lambda b: (b[order_field] if order_field else 0, b["_id"]))
+    return [book["isbn"] for book in selected]
+
+
+@pytest.mark.parametrize(
+    "params, match, order_field",
+    [
+        ({}, lambda b: True, None),
+        ({"publisher": "АСТ"}, lambda b: b["publisher"] == "АСТ", None),
+        ({"q": "Ко"}, lambda b: b["title"].startswith("Ко"), "title"),
+        (
+            {"q": "Ки", "field": "author"},
+            lambda b: b["author"].startswith("Ки"),
+            "author",
+        ),
+        (
+            {"year_from": 2002, "year_to": 2005},
+            lambda b: 2002 <= b["publication_year"] <= 2005,
+            "publication_year",
+        ),
+        (
+            {"price_min": 200, "publisher": "Эксмо"},
+            lambda b: b["price_amount"] >= 200 and b["publisher"] == "Эксмо",
+            "price_amount",
+        ),
+        (
+            {"q": "К", "year_to": 2003},
+            lambda b: b["title"].startswith("К") and b["publication_year"] <= 2003,
+            "title",
+        ),
+    ],
+)
+def test_pages_cover_every_match_once_in_order(books, params, match, order_field):
+    isbns = all_pages(params)
+    assert len(isbns) > 4  # more than one page
+    assert isbns == expected(books, match, order_field)
+
+
+def test_cursor_of_another_query_is_rejected(books):
+    page = json.loads(get({"q": "Ко", "limit": 2}).content)
+    response = get({"year_from": 2001, "cursor": page["next_cursor"]})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WyJ4IiwgMSwgIjAiXQ=="])
+def test_invalid_cursor_is_rejected(books, cursor):
+    assert get({"cursor": cursor}).status_code == 400
+
+
+def test_text_search_does_not_take_a_cursor(books):
+    page = json.loads(get({"limit": 2}).content)
+    response = get({"q": "Кот", "match": "text", "cursor": page["next_cursor"]})
+    assert response.status_code == 400
@@ -0,0 +1,51 @@
+# hw2/tests/test_sitemap_shards.py
+
+"""
+Sharding of ChitaiGorodSitemapSpider's sitemap tree.
+
+- Entries of a sitemap index always pass, even when their URL looks like a
+  product page, so every shard reads every child sitemap.
+- Product pages of a <urlset> are split: each one is requested by exactly
+  one shard.
+"""
+
+from scrapy.http import Request, XmlResponse
+from scrapy.utils.test import get_crawler
+
+from book_scraper.spiders.chitai_gorod_sitemap import ChitaiGorodSitemapSpider
+
+SHARDS = 3
+SITE = "https://www.chitai-gorod.ru"
+CHILD_SITEMAPS = [f"{SITE}/sitemap/product/{n}.xml" for n in range(1, 5)]
+PRODUCTS = [f"{SITE}/product/kniga-{n}-{3000 + n}" for n in range(30)]
+
+
+def xml(root, tag, locs):
+    entries = "".join(f"<{tag}><loc>{loc}</loc></{tag}>" for loc in locs)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<{root} xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"{entries}</{root}>"
+    ).encode()
+
+
+def requested(shard_index, url, body):
+    crawler = get_crawler(ChitaiGorodSitemapSpider)
+    spider = ChitaiGorodSitemapSpider.from_crawler(
+        crawler, shard_index=shard_index, shard_count=SHARDS
+    )
+    response = XmlResponse(url, body=body, request=Request(url))
+    return [r.url for r in spider._parse_sitemap(response)]
+
+
+def test_every_shard_reads_every_child_sitemap():
+    body = xml("sitemapindex", "sitemap", CHILD_SITEMAPS)
+    for shard in range(SHARDS):
+        assert requested(shard, f"{SITE}/sitemap.xml", body) == CHILD_SITEMAPS
+
+
+def test_product_pages_are_split_between_shards():
+    body = xml("urlset", "url", PRODUCTS)
+    per_shard = [requested(shard, CHILD_SITEMAPS[0], body) for shard in range(SHARDS)]
+    assert all(per_shard)
+    assert sorted(url for urls in per_shard for url in urls) == sorted(PRODUCTS)
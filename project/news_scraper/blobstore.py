@@ -0,0 +1,130 @@
+# project/news_scraper/blobstore.py
+
+"""
+Content-addressed storage for article header photos.
+
+- Each unique image is stored once, keyed by the SHA-256 of its bytes.
+- LocalBlobStore keeps blobs in a directory tree (<root>/ab/cd/<sha256>).
+- GridFSBlobStore keeps blobs in a MongoDB GridFS bucket (_id = sha256).
+- UrlIndex is an append-only on-disk URL -> blob mapping, so a photo that
+  was already seen is neither downloaded nor stored again.
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+
+import gridfs
+import pymongo
+
+
+def blob_info(data, content_type=None, url=None):
+    """Returns the blob descriptor (hash, size, MIME type) for image bytes."""
+    mime_type = (content_type or "").split(";")[0].strip()
+    if not mime_type and url:
+        mime_type = mimetypes.guess_type(url.split("?")[0])[0] or ""
+    return {
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+        "mime_type": mime_type or "application/octet-stream",
+    }
+
+
+class LocalBlobStore:
+    """Stores blobs as files in a content-addressed directory tree."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def has(self, digest):
+        return os.path.exists(self.path_for(digest))
+
+    def put(self, digest, data, mime_type=None):
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            return False
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a private temp file first, so a crash never leaves a truncated
+        # blob and concurrent writers of the same digest never share one
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix=f".{digest}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            if os.path.exists(path):  # another writer stored it meanwhile
+                return False
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return True
+
+    def close(self):
+        pass
+
+
+class GridFSBlobStore:
+    """Stores blobs in a GridFS bucket, using the SHA-256 as the file _id."""
+
+    def __init__(self, mongodb_uri, mongodb_db, bucket_name="header_photos"):
+        self.client = pymongo.MongoClient(mongodb_uri)
+        db = self.client[mongodb_db]
+        self.files = db[f"{bucket_name}.files"]
+        self.bucket = gridfs.GridFSBucket(db, bucket_name=bucket_name)
+
+    def has(self, digest):
+        return self.files.count_documents({"_id": digest}, limit=1) > 0
+
+    def put(self, digest, data, mime_type=None):
+        if self.has(digest):
+            return False
+        try:
+            self.bucket.upload_from_stream_with_id(
+                digest, digest, data, metadata={"mime_type": mime_type}
+            )
+        except gridfs.errors.FileExists:
+            return False
+        return True
+
+    def close(self):
+        self.client.close()
+
+
+class UrlIndex:
+    """Append-only JSONL index: image URL -> blob descriptor."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    self.entries[record.pop("url")] = record
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def add(self, url, info):
+        self.entries[url] = info
+        self.file.write(json.dumps({"url": url, **info}) + "\n")
+        self.file.flush()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,82 @@
+# project/news_scraper/crawl_state.py
+
+"""
+Set of already scraped articles, used by the incremental listing mode.
+
+- NEWS_KNOWN_URLS_SOURCE = "mongodb": reads stored source_url values from the
+  MongoDB collection written by MongoDBPipeline (nothing to save afterwards).
+- NEWS_KNOWN_URLS_SOURCE = "file": reads/writes a plain text state file with
+  one article URL per line (NEWS_STATE_FILE).
+
+Articles are compared by URL path, so relative links from the listing page
+and absolute source_url values match.
+"""
+
+import os
+from urllib.parse import urlparse
+
+import pymongo
+
+
+def url_path(url):
+    return urlparse(url).path
+
+
+class KnownArticleStore:
+    SOURCES = ("mongodb", "file")
+
+    def __init__(self, source, state_file, mongodb_uri, mongodb_db, mongodb_collection):
+        if source not in self.SOURCES:
+            raise ValueError(
+                f"NEWS_KNOWN_URLS_SOURCE must be one of {self.SOURCES}, got {source!r}"
+            )
+        self.source = source
+        self.state_file = state_file
+        self.mongodb_uri = mongodb_uri
+        self.mongodb_db = mongodb_db
+        self.mongodb_collection = mongodb_collection
+        self.paths = set()
+        self.new_urls = []
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            source=settings.get("NEWS_KNOWN_URLS_SOURCE", "mongodb"),
+            state_file=settings.get("NEWS_STATE_FILE", "news_state.txt"),
+            mongodb_uri=settings.get("MONGODB_URI", "mongodb://localhost:27017"),
+            mongodb_db=settings.get("MONGODB_DATABASE", "news"),
+            mongodb_collection=settings.get("MONGODB_COLLECTION", "articles"),
+        )
+
+    def load(self):
+        """Loads known article paths and returns them as a set."""
+        if self.source == "mongodb":
+            client = pymongo.MongoClient(self.mongodb_uri)
+            try:
+                collection = client[self.mongodb_db][self.mongodb_collection]
+                for doc in collection.find({}, {"source_url": 1, "_id": 0}):
+                    if doc.get("source_url"):
+                        self.paths.add(url_path(doc["source_url"]))
+            finally:
+                client.close()
+        elif os.path.exists(self.state_file):
+            with open(self.state_file, encoding="utf-8") as f:
+                self.paths.update(url_path(line.strip()) for line in f if line.strip())
+        return self.paths
+
+    def is_known(self, url):
+        return url_path(url) in self.paths
+
+    def add(self, url):
+        path = url_path(url)
+        if path not in self.paths:
+            self.paths.add(path)
+            self.new_urls.append(url)
+
+    def save(self):
+        """Appends newly scraped URLs to the state file (file source only)."""
+        if self.source != "file" or not self.new_urls:
+            return
+        with open(self.state_file, "a", encoding="utf-8") as f:
+            f.writelines(f"{url}\n" for url in self.new_urls)
+        self.new_urls = []
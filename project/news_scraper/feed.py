@@ -0,0 +1,79 @@
+# project/news_scraper/feed.py
+
+"""
+Helpers for paging the kp.ru "Показать еще" feed directly over HTTP.
+
+- extract_news_links() pulls article links out of any feed payload (JSON or
+  HTML fragment) in document order; the rendered listing page goes through
+  the same function, so both listing modes yield the same link set.
+- FeedPaginator turns the feed URL captured from the browser (or configured
+  via NEWS_FEED_URL_TEMPLATE) into URLs for the following pages.
+"""
+
+import re
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+NEWS_LINK_RE = re.compile(r"/online/news/\d+/?")
+
+# Query parameters that look like pagination, and how they advance
+PAGE_PARAMS = ("page", "p", "pageNumber", "page_number")
+OFFSET_PARAMS = ("offset", "from", "skip", "start")
+
+
+def extract_news_links(text):
+    """Returns unique article paths (/online/news/<id>/) in order of appearance."""
+    text = text.replace("\\/", "/")  # JSON may escape slashes
+    links = []
+    seen = set()
+    for match in NEWS_LINK_RE.finditer(text):
+        path = match.group(0).rstrip("/") + "/"
+        if path not in seen:
+            seen.add(path)
+            links.append(path)
+    return links
+
+
+class FeedPaginator:
+    """
+    Builds feed page URLs.
+
+    Either from an explicit template with a {page} placeholder, or from a
+    captured feed URL whose numeric page/offset query parameter is advanced.
+    """
+
+    def __init__(self, template=None, captured_url=None):
+        self.template = template
+        self.param = None
+        self.kind = None
+        self.first_value = None
+        if template:
+            self.kind = "template"
+        elif captured_url:
+            self.parts = urlparse(captured_url)
+            self.query = parse_qsl(self.parts.query, keep_blank_values=True)
+            for name, value in self.query:
+                if value.isdigit() and name in PAGE_PARAMS + OFFSET_PARAMS:
+                    self.param = name
+                    self.kind = "page" if name in PAGE_PARAMS else "offset"
+                    self.first_value = int(value)
+                    break
+
+    @property
+    def usable(self):
+        return self.kind is not None
+
+    def url_for(self, step, page_size=None):
+        """
+        URL of the feed page `step` pages after the first one fetched
+        (step=0 is the captured/first page itself).
+        """
+        if self.kind == "template":
+            return self.template.format(page=step + 1)
+        if self.kind == "page":
+            value = self.first_value + step
+        else:
+            value = self.first_value + step * (page_size or 1)
+        query = [
+            (name, str(value) if name == self.param else v) for name, v in self.query
+        ]
+        return urlunparse(self.parts._replace(query=urlencode(query)))
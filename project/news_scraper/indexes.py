@@ -0,0 +1,15 @@
+# project/news_scraper/indexes.py
+
+"""
+MongoDB indexes required by the news articles collection.
+Ensured by MongoDBPipeline on open_spider.
+"""
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+NEWS_INDEXES = [
+    # Upsert key and incremental-mode lookups
+    IndexModel([("source_url", ASCENDING)], name="source_url_unique", unique=True),
+    # Newest-first listings and date range queries
+    IndexModel([("publication_datetime", DESCENDING)], name="publication_datetime"),
+]
@@ -21,6 +21,12 @@ class NewsScraperItem(scrapy.Item):
     header_photo_url = scrapy.Field()
     # Base64-encoded header photo (optional)
     header_photo_base64 = scrapy.Field()
+    # SHA-256 of the header photo in the blob store (optional, blob storage modes)
+    header_photo_sha256 = scrapy.Field()
+    # Size of the header photo in bytes (optional, blob storage modes)
+    header_photo_size = scrapy.Field()
+    # MIME type of the header photo (optional, blob storage modes)
+    header_photo_mime_type = scrapy.Field()
     # Article keywords/tags (required)
     keywords = scrapy.Field()
     # Author(s) of the article (required)
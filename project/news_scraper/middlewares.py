@@ -3,15 +3,14 @@
 """
 Custom middlewares for the news_scraper project.
 
-Currently, no custom logic is implemented.
-These stubs can be extended for:
-- Adding custom headers
-- Proxy rotation
-- Error handling
-- Request/response transformations
+- NewsScraperSpiderMiddleware: pass-through stub (not in use).
+- NewsScraperDownloaderMiddleware: records responses to / replays them from
+  WARC archives (WARC_MODE, see scraping_common/warc.py); does nothing when
+  WARC_MODE is "off". Replayed Playwright responses have no live page
+  (no "playwright_page" in meta, PageMethod results are None).
 """
 
-from scrapy import signals
+from scraping_common.warc import WarcMiddleware
 
 
 class NewsScraperSpiderMiddleware:
@@ -27,13 +26,5 @@ class NewsScraperSpiderMiddleware:
             yield item
 
 
-class NewsScraperDownloaderMiddleware:
-    """Downloader middleware (currently not in use)."""
-
-    @classmethod
-    def from_crawler(cls, crawler):
-        return cls()
-
-    def process_response(self, request, response, spider):
-        # Simply return response as is
-        return response
+class NewsScraperDownloaderMiddleware(WarcMiddleware):
+    """WARC record/replay downloader middleware (WARC_MODE)."""
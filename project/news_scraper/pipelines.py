@@ -4,19 +4,45 @@ Pipelines for news_scraper.
 Tasks:
 - Normalize fields: title, article_text, authors
 - Convert publication_datetime to ISO 8601 format
-- Download header image and encode as Base64
+- Download header image (through Scrapy's downloader) and either encode it
+  as Base64 or store it once in a content-addressed blob store
 - Save items into MongoDB (if enabled)
 """
 
+import asyncio
 import base64
-import requests
+import logging
 from datetime import datetime
+from urllib.parse import urlparse
+
+import scrapy
 from itemadapter import ItemAdapter
-import pymongo
+from scrapy.utils.defer import maybe_deferred_to_future
+
+from news_scraper.blobstore import GridFSBlobStore, LocalBlobStore, UrlIndex, blob_info
+from news_scraper.indexes import NEWS_INDEXES
+from scraping_common.mongo import MongoDBPipeline as BaseMongoDBPipeline
+
+logger = logging.getLogger(__name__)
 
 
 class NewsScraperPipeline:
-    """Pipeline for cleaning and normalizing scraped data."""
+    """
+    Pipeline for cleaning and normalizing scraped data.
+
+    Header photos are fetched asynchronously via the crawler's own downloader,
+    so a slow image CDN never blocks the reactor. They go through their own
+    downloader slot (IMAGE_DOWNLOAD_SLOT, no delay), not the slot of the image
+    host. Downloads are capped globally and per host, and failed downloads are
+    retried with exponential backoff.
+
+    HEADER_PHOTO_STORAGE selects how the photo is kept on the item:
+    - "base64": inline Base64 string in header_photo_base64 (default)
+    - "local" / "gridfs": bytes are written once to a content-addressed blob
+      store, the item keeps only header_photo_sha256/size/mime_type
+    """
+
+    STORAGE_MODES = ("base64", "local", "gridfs")
 
     # Mapping of Russian month names to numeric values
     MONTHS = {
@@ -34,7 +60,69 @@ class NewsScraperPipeline:
         "декабря": "12",
     }
 
-    def process_item(self, item, spider):
+    def __init__(self, crawler):
+        self.crawler = crawler
+        settings = crawler.settings
+        self.download_timeout = settings.getfloat("IMAGE_DOWNLOAD_TIMEOUT", 10)
+        self.retry_times = settings.getint("IMAGE_DOWNLOAD_RETRY_TIMES", 2)
+        self.retry_backoff = settings.getfloat("IMAGE_DOWNLOAD_RETRY_BACKOFF", 1.0)
+        self.per_host_concurrency = settings.getint(
+            "IMAGE_DOWNLOAD_CONCURRENCY_PER_HOST", 4
+        )
+        self.concurrency = settings.getint("IMAGE_DOWNLOAD_CONCURRENCY", 8)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.host_semaphores = {}
+        self.download_slot = settings.get("IMAGE_DOWNLOAD_SLOT", "header_photos")
+        slot = settings.getdict("DOWNLOAD_SLOTS").get(self.download_slot, {})
+        if slot.get("concurrency", 0) < self.concurrency or slot.get("delay"):
+            logger.warning(
+                f"DOWNLOAD_SLOTS[{self.download_slot!r}] = {slot!r} limits header "
+                "photo downloads below IMAGE_DOWNLOAD_CONCURRENCY; give it that "
+                "concurrency and delay 0"
+            )
+
+        self.storage_mode = settings.get("HEADER_PHOTO_STORAGE", "base64")
+        if self.storage_mode not in self.STORAGE_MODES:
+            raise ValueError(
+                f"HEADER_PHOTO_STORAGE must be one of {self.STORAGE_MODES}, "
+                f"got {self.storage_mode!r}"
+            )
+        self.blob_store = None
+        self.url_index = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def open_spider(self, spider):
+        if self.storage_mode == "base64":
+            return
+        settings = self.crawler.settings
+        if self.storage_mode == "local":
+            self.blob_store = LocalBlobStore(
+                settings.get("HEADER_PHOTO_STORE_DIR", "header_photos")
+            )
+        else:
+            self.blob_store = GridFSBlobStore(
+                settings.get("MONGODB_URI", "mongodb://localhost:27017"),
+                settings.get("MONGODB_DATABASE", "news"),
+                settings.get("HEADER_PHOTO_GRIDFS_BUCKET", "header_photos"),
+            )
+        self.url_index = UrlIndex(
+            settings.get("HEADER_PHOTO_INDEX_FILE", "header_photos/url_index.jsonl")
+        )
+        spider.logger.info(
+            f"[NewsScraperPipeline] Header photo storage: {self.storage_mode}, "
+            f"{len(self.url_index)} known photo URLs"
+        )
+
+    def close_spider(self, spider):
+        if self.blob_store is not None:
+            self.blob_store.close()
+        if self.url_index is not None:
+            self.url_index.close()
+
+    async def process_item(self, item, spider):
         adapter = ItemAdapter(item)
 
         # --- Normalize title ---
@@ -73,54 +161,110 @@ class NewsScraperPipeline:
             except Exception as e:
                 spider.logger.warning(f"Failed to parse date '{pub_dt}': {e}")
 
-        # --- Download and encode header image as Base64 ---
+        # --- Download header image: Base64 inline or content-addressed blob ---
         img_url = adapter.get("header_photo_url")
         if img_url:
-            try:
-                response = requests.get(img_url, timeout=10)
-                response.raise_for_status()
-                adapter["header_photo_base64"] = base64.b64encode(
-                    response.content
-                ).decode("utf-8")
-            except requests.RequestException as e:
-                spider.logger.warning(f"Failed to download image {img_url}: {e}")
+            if self.storage_mode == "base64":
+                response = await self.download_image(img_url, spider)
+                adapter["header_photo_base64"] = (
+                    base64.b64encode(response.body).decode("utf-8")
+                    if response is not None
+                    else None
+                )
+            else:
+                info = await self.store_image(img_url, spider)
                 adapter["header_photo_base64"] = None
+                adapter["header_photo_sha256"] = info and info["sha256"]
+                adapter["header_photo_size"] = info and info["size"]
+                adapter["header_photo_mime_type"] = info and info["mime_type"]
 
         return item
 
+    async def store_image(self, img_url, spider):
+        """
+        Returns the blob descriptor for an image URL, downloading and storing
+        the image only if the URL is not in the on-disk index yet.
+        """
+        info = self.url_index.get(img_url)
+        if info is not None:
+            self.crawler.stats.inc_value("header_photo/index_hit")
+            return info
 
-class MongoDBPipeline:
-    """Pipeline to save news items into MongoDB."""
-
-    def __init__(self, mongodb_uri, mongodb_db, mongodb_collection):
-        self.mongodb_uri = mongodb_uri
-        self.mongodb_db = mongodb_db
-        self.mongodb_collection = mongodb_collection
+        response = await self.download_image(img_url, spider)
+        if response is None:
+            return None
+        info = blob_info(
+            response.body,
+            content_type=response.headers.get("Content-Type", b"").decode("latin-1"),
+            url=img_url,
+        )
+        # Blob writes may hit the disk or GridFS, keep them off the reactor thread
+        created = await asyncio.to_thread(
+            self.blob_store.put, info["sha256"], response.body, info["mime_type"]
+        )
+        self.crawler.stats.inc_value(
+            "header_photo/blob_stored" if created else "header_photo/blob_deduplicated"
+        )
+        self.url_index.add(img_url, info)
+        return info
 
-    @classmethod
-    def from_crawler(cls, crawler):
-        return cls(
-            mongodb_uri=crawler.settings.get(
-                "MONGODB_URI", "mongodb://localhost:27017"
-            ),
-            mongodb_db=crawler.settings.get("MONGODB_DATABASE", "news"),
-            mongodb_collection=crawler.settings.get("MONGODB_COLLECTION", "articles"),
+    async def download_image(self, img_url, spider):
+        """
+        Downloads an image through the crawler's downloader.
+        Returns the response, or None if all attempts failed.
+        """
+        host = urlparse(img_url).netloc
+        host_semaphore = self.host_semaphores.setdefault(
+            host, asyncio.Semaphore(self.per_host_concurrency)
         )
+        stats = self.crawler.stats
 
-    def open_spider(self, spider):
-        spider.logger.info("[MongoDBPipeline] Connecting to MongoDB...")
-        self.client = pymongo.MongoClient(self.mongodb_uri)
-        self.db = self.client[self.mongodb_db]
-        self.collection = self.db[self.mongodb_collection]
+        for attempt in range(self.retry_times + 1):
+            if attempt:
+                # Exponential backoff: 1x, 2x, 4x ... of IMAGE_DOWNLOAD_RETRY_BACKOFF
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                stats.inc_value("header_photo/retry_count")
+            request = scrapy.Request(
+                img_url,
+                meta={
+                    "download_slot": self.download_slot,
+                    "download_timeout": self.download_timeout,
+                    # Retries (with backoff) are handled here, not by RetryMiddleware
+                    "dont_retry": True,
+                },
+                dont_filter=True,
+            )
+            try:
+                async with self.semaphore, host_semaphore:
+                    response = await maybe_deferred_to_future(
+                        self.crawler.engine.download(request)
+                    )
+            except Exception as e:
+                error = e
+            else:
+                if response.status == 200:
+                    stats.inc_value("header_photo/downloaded")
+                    return response
+                error = f"HTTP {response.status}"
 
-    def close_spider(self, spider):
-        spider.logger.info("[MongoDBPipeline] Closing MongoDB connection.")
-        self.client.close()
+        spider.logger.warning(f"Failed to download image {img_url}: {error}")
+        stats.inc_value("header_photo/failed")
+        return None
+
+
+class MongoDBPipeline(BaseMongoDBPipeline):
+    """Pipeline to save news items into MongoDB (buffered bulk upserts by URL)."""
 
-    def process_item(self, item, spider):
-        data = ItemAdapter(item).asdict()
+    KEY_FIELD = "source_url"
+    DEFAULT_DATABASE = "news"
+    DEFAULT_COLLECTION = "articles"
+    INDEXES = NEWS_INDEXES
+
+    def log_item(self, data, spider):
         spider.logger.info(f"[MongoDBPipeline] Saving article: {data.get('title')}")
-        self.collection.update_one(
-            {"source_url": data.get("source_url")}, {"$set": data}, upsert=True
-        )
-        return item
+
+    def items_stored(self, keys, spider):
+        # Incremental runs: an article is known once it is stored, not when parsed
+        if getattr(spider, "incremental", False):
+            for url in keys:
+                spider.known_articles.add(url)
@@ -5,6 +5,11 @@ Scrapy project settings for news_scraper.
 - Cleans and normalizes scraped data via pipelines.
 - Saves results to MongoDB (primary storage).
 - Optionally allows JSONL export by uncommenting FEEDS section.
+- Optionally records responses to / replays them from WARC archives.
+- Caches pages and revalidates them with conditional requests on repeat crawls.
+
+Requires the repository root on PYTHONPATH for the shared scraping_common
+package (e.g. from project/: PYTHONPATH=.. scrapy crawl news_spider).
 """
 
 BOT_NAME = "news_scraper"
@@ -44,11 +49,27 @@ FEED_EXPORT_FIELDS = [
     "publication_datetime",
     "header_photo_url",
     "header_photo_base64",
+    "header_photo_sha256",
+    "header_photo_size",
+    "header_photo_mime_type",
     "keywords",
     "authors",
     "source_url",
 ]
 
+# Listing expansion ("Показать еще"): max wait for new links after a click, ms
+NEWS_LOAD_MORE_TIMEOUT = 10000
+
+# Feed listing mode (scrapy crawl news_spider -a listing_mode=feed): URL of the
+# "Показать еще" endpoint with a {page} placeholder (1-based). If None, the
+# endpoint is captured once from the browser when the button is clicked.
+NEWS_FEED_URL_TEMPLATE = None
+
+# Incremental mode (scrapy crawl news_spider -a incremental=1):
+# where to read already scraped article URLs from, "mongodb" or "file"
+NEWS_KNOWN_URLS_SOURCE = "mongodb"
+NEWS_STATE_FILE = "news_state.txt"  # used when NEWS_KNOWN_URLS_SOURCE = "file"
+
 # Pipelines for:
 # - Normalization & image Base64 encoding
 # - MongoDB storage
@@ -57,10 +78,74 @@ ITEM_PIPELINES = {
     "news_scraper.pipelines.MongoDBPipeline": 400,
 }
 
+# Header photo downloads (async, through Scrapy's downloader)
+IMAGE_DOWNLOAD_CONCURRENCY = 8  # max images in flight overall
+IMAGE_DOWNLOAD_CONCURRENCY_PER_HOST = 4  # max images in flight per image host
+IMAGE_DOWNLOAD_TIMEOUT = 10  # seconds per attempt
+IMAGE_DOWNLOAD_RETRY_TIMES = 2
+IMAGE_DOWNLOAD_RETRY_BACKOFF = 1.0  # seconds, doubled on every retry
+# Images get their own downloader slot: the per-domain limit and DOWNLOAD_DELAY
+# above are for kp.ru pages and would fetch one image per second per CDN host
+IMAGE_DOWNLOAD_SLOT = "header_photos"
+DOWNLOAD_SLOTS = {
+    IMAGE_DOWNLOAD_SLOT: {
+        "concurrency": IMAGE_DOWNLOAD_CONCURRENCY,
+        "delay": 0,
+        "jitter": 0,
+    },
+}
+
+# Header photo storage: "base64" (inline in the item), "local" or "gridfs"
+# (content-addressed blob store, item keeps only hash/size/MIME type)
+HEADER_PHOTO_STORAGE = "base64"
+HEADER_PHOTO_STORE_DIR = "header_photos"
+HEADER_PHOTO_GRIDFS_BUCKET = "header_photos"
+HEADER_PHOTO_INDEX_FILE = "header_photos/url_index.jsonl"  # URL -> hash index
+
 # MongoDB settings
 MONGODB_URI = "mongodb://localhost:27017"
 MONGODB_DATABASE = "news"
 MONGODB_COLLECTION = "articles"
+# Upserts are buffered and written with one bulk_write per batch
+MONGODB_BATCH_SIZE = 100  # flush when this many items are buffered...
+MONGODB_FLUSH_INTERVAL = 5.0  # ...or when this many seconds have passed
+# Writes run on a dedicated thread pool, off the reactor thread
+MONGODB_WRITER_THREADS = 2
+# Max batches queued/in flight before items are held back (backpressure)
+MONGODB_MAX_PENDING_BATCHES = 4
+# Create required indexes on open_spider (False: only log the missing ones)
+MONGODB_ENSURE_INDEXES = True
+# Load stored content fingerprints on open_spider, so unchanged items are not rewritten
+MONGODB_PRELOAD_FINGERPRINTS = True
+
+# HTTP cache and WARC record/replay
+DOWNLOADER_MIDDLEWARES = {
+    # Conditional HTTP cache with compressed storage (see HTTPCACHE_* below)
+    "scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware": None,
+    "scraping_common.httpcache.ConditionalHttpCacheMiddleware": 900,
+    "news_scraper.middlewares.NewsScraperDownloaderMiddleware": 950,
+}
+
+# Response record/replay (scraping_common/warc.py): "off", "record" (write every
+# downloaded response to WARC archives in WARC_DIR) or "replay" (answer requests
+# from those archives, no network or browser), e.g.
+# scrapy crawl news_spider -s WARC_MODE=replay
+WARC_MODE = "off"
+WARC_DIR = "warc"
+WARC_MAX_FILE_SIZE = 1024**3  # start a new .warc.gz file after 1 GB
+
+# Conditional HTTP cache (scraping_common/httpcache.py): repeat crawls send
+# If-None-Match/If-Modified-Since and take unchanged pages (304) from a local
+# zstd-compressed store; Playwright requests are never cached. Turned off
+# automatically while WARC_MODE is record/replay (archives need full bodies)
+HTTPCACHE_ENABLED = True
+HTTPCACHE_DIR = "httpcache"
+HTTPCACHE_STORAGE = "scraping_common.httpcache.CompressedCacheStorage"
+HTTPCACHE_POLICY = "scraping_common.httpcache.ConditionalCachePolicy"
+# Revalidate every page that has an ETag/Last-Modified instead of guessing freshness
+HTTPCACHE_ALWAYS_REVALIDATE = True
+# Max size of the compressed bodies; least recently used entries are evicted beyond it
+HTTPCACHE_MAX_SIZE = 2 * 1024**3
 
 # Playwright integration
 DOWNLOAD_HANDLERS = {
@@ -77,6 +162,39 @@ PLAYWRIGHT_LAUNCH_OPTIONS = {
     "headless": True,
 }
 
+# Resource blocking for Playwright pages (see news_scraper/playwright_blocking.py)
+PLAYWRIGHT_BLOCKING_ENABLED = True
+# Playwright resource types that are never needed by the parsers
+PLAYWRIGHT_BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]
+# URL regexes to abort regardless of type (ads, trackers, analytics, video embeds)
+PLAYWRIGHT_BLOCKED_URL_PATTERNS = [
+    r"doubleclick\.net",
+    r"googlesyndication\.com",
+    r"google-analytics\.com",
+    r"googletagmanager\.com",
+    r"mc\.yandex\.ru",
+    r"an\.yandex\.ru",
+    r"yandex\.ru/ads",
+    r"top-fwz1\.mail\.ru",
+    r"adfox\.ru",
+    r"adriver\.ru",
+    r"youtube\.com/embed",
+    r"rutube\.ru/play/embed",
+    r"vk\.com/video_ext",
+]
+# URL regexes that are always allowed (override both deny rules above)
+PLAYWRIGHT_ALLOWED_URL_PATTERNS = []
+# Rough average size per blocked resource type: the playwright_blocking/
+# estimated_bytes_saved stat is computed from these guesses, not measured
+PLAYWRIGHT_BLOCKED_ESTIMATED_BYTES = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 40_000,
+    "script": 30_000,
+    "stylesheet": 20_000,
+    "other": 5_000,
+}
+
 # Default headers to mimic real browser
 DEFAULT_REQUEST_HEADERS = {
     "User-Agent": (
@@ -1,80 +1,368 @@
+import json
+
 import scrapy
+from scrapy import signals
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from scrapy_playwright.page import PageMethod
+from news_scraper.crawl_state import KnownArticleStore
+from news_scraper.feed import FeedPaginator, extract_news_links
 from news_scraper.items import NewsScraperItem
+from news_scraper.playwright_blocking import ResourceBlocker
 
 
 class NewsSpider(scrapy.Spider):
     """
     Spider for extracting news from kp.ru/online using Playwright.
     - Clicks 'Показать еще' multiple times to load more news items.
+    - fetch_mode=playwright (default): every article is rendered by Playwright.
+    - fetch_mode=hybrid: articles are fetched over plain HTTP first and only
+      re-fetched with Playwright if the server-rendered HTML lacks the blocks
+      parse_article needs (run with: scrapy crawl news_spider -a fetch_mode=hybrid).
+    - incremental=1: stops loading more once a batch contains only articles that
+      are already stored (MongoDB or a state file) and skips those articles.
+      An article is marked known only once it is stored, so dropped items and
+      failed writes are retried on the next run.
+    - listing_mode=feed: instead of clicking in the browser, pages the feed
+      endpoint behind 'Показать еще' over plain HTTP (captured once via
+      Playwright, or taken from NEWS_FEED_URL_TEMPLATE).
     """
 
     name = "news_spider"
+    incremental = False
     allowed_domains = ["kp.ru"]
     start_urls = ["https://www.kp.ru/online/"]
 
+    FETCH_MODES = ("playwright", "hybrid")
+    LISTING_MODES = ("click", "feed")
+    LOAD_MORE_BUTTON = "button:has-text('Показать еще')"
+
+    # Blocks parse_article relies on; if all are present, no JS rendering is needed
+    ARTICLE_BODY_XPATH = '//div[@data-gtm-el="content-body"]'
+    ARTICLE_DATE_XPATH = '//a[@data-is-first="true"]/following-sibling::span/text()'
+
+    def playwright_meta(self, page_methods, **extra):
+        """Builds Playwright request meta, with resource blocking if enabled."""
+        meta = {"playwright": True, "playwright_page_methods": page_methods, **extra}
+        if self.settings.getbool("PLAYWRIGHT_BLOCKING_ENABLED"):
+            if not hasattr(self, "resource_blocker"):
+                self.resource_blocker = ResourceBlocker.from_crawler(self.crawler)
+            meta["playwright_page_init_callback"] = self.resource_blocker.init_page
+        return meta
+
+    def setup_incremental(self):
+        """Loads known article paths if the spider runs with -a incremental=1."""
+        self.incremental = str(getattr(self, "incremental", "")).lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        if not self.incremental:
+            return []
+        self.known_articles = KnownArticleStore.from_settings(self.settings)
+        known_paths = sorted(self.known_articles.load())
+        # Articles become known once stored: MongoDBPipeline reports its written
+        # batches; without it, an item that made it through all pipelines counts
+        pipelines = self.settings.getwithbase("ITEM_PIPELINES")
+        if pipelines.get("news_scraper.pipelines.MongoDBPipeline") is None:
+            self.crawler.signals.connect(self.item_stored, signal=signals.item_scraped)
+        self.logger.info(
+            f"Incremental mode: {len(known_paths)} known articles, "
+            "stopping once a loaded batch has only known ones"
+        )
+        return known_paths
+
     def start_requests(self):
         max_clicks = int(getattr(self, "load_more_clicks", 20))
+        known_paths = self.setup_incremental()
+
+        listing_mode = getattr(self, "listing_mode", "click")
+        if listing_mode not in self.LISTING_MODES:
+            raise ValueError(
+                f"listing_mode must be one of {self.LISTING_MODES}, got {listing_mode!r}"
+            )
+        if listing_mode == "feed":
+            yield from self.feed_start_requests()
+            return
+
         self.logger.info(
             f"Using Playwright with up to {max_clicks} clicks for 'Показать еще' button."
         )
+        wait_timeout = self.settings.getint("NEWS_LOAD_MORE_TIMEOUT", 10000)
 
+        # Waits for new links via MutationObserver instead of a fixed sleep;
+        # in incremental mode stops as soon as a loaded batch is fully known
         script = f"""
         async () => {{
+            const known = new Set({json.dumps(known_paths)});
+            const incremental = {json.dumps(self.incremental)};
+            const selector = "a[href^='/online/news/']";
+            const seen = new Set();
+            const collectNew = () => {{
+                const fresh = [];
+                for (const a of document.querySelectorAll(selector)) {{
+                    const path = new URL(a.href).pathname;
+                    if (!seen.has(path)) {{
+                        seen.add(path);
+                        fresh.push(path);
+                    }}
+                }}
+                return fresh;
+            }};
+            const isCaughtUp = (batch) =>
+                incremental && batch.length > 0 && batch.every(p => known.has(p));
+            const waitForMoreLinks = (prevCount) => new Promise(resolve => {{
+                let timer = null;
+                const observer = new MutationObserver(() => {{
+                    if (document.querySelectorAll(selector).length > prevCount) finish(true);
+                }});
+                const finish = (loaded) => {{
+                    observer.disconnect();
+                    clearTimeout(timer);
+                    resolve(loaded);
+                }};
+                observer.observe(document.body, {{childList: true, subtree: true}});
+                timer = setTimeout(() => finish(false), {wait_timeout});
+            }});
+
             let actualClicks = 0;
-            for (let i = 0; i < {max_clicks}; i++) {{
-                const btn = [...document.querySelectorAll('button')].find(el => el.textContent.includes('Показать еще'));
-                if (!btn) break;
-                btn.click();
-                actualClicks++;
-                console.log('Clicked button ' + actualClicks);
-                window.scrollTo(0, document.body.scrollHeight);
-                await new Promise(r => setTimeout(r, 2500));
+            let stopReason = 'max_clicks';
+            if (isCaughtUp(collectNew())) {{
+                stopReason = 'caught_up';
+            }} else {{
+                for (let i = 0; i < {max_clicks}; i++) {{
+                    const btn = [...document.querySelectorAll('button')].find(el => el.textContent.includes('Показать еще'));
+                    if (!btn) {{
+                        stopReason = 'no_button';
+                        break;
+                    }}
+                    const before = document.querySelectorAll(selector).length;
+                    btn.click();
+                    actualClicks++;
+                    console.log('Clicked button ' + actualClicks);
+                    window.scrollTo(0, document.body.scrollHeight);
+                    if (!(await waitForMoreLinks(before))) {{
+                        stopReason = 'timeout';
+                        break;
+                    }}
+                    if (isCaughtUp(collectNew())) {{
+                        stopReason = 'caught_up';
+                        break;
+                    }}
+                }}
             }}
             window.__scrapy_clicks = actualClicks;
-            return actualClicks;
+            return {{clicks: actualClicks, stopReason: stopReason}};
         }}
         """
 
         yield scrapy.Request(
             self.start_urls[0],
-            meta={
-                "playwright": True,
-                "playwright_include_page": True,
-                "playwright_page_methods": [
+            meta=self.playwright_meta(
+                [
                     PageMethod(
-                        "wait_for_selector",
-                        "button:has-text('Показать еще')",
-                        timeout=60000,
+                        "wait_for_selector", self.LOAD_MORE_BUTTON, timeout=60000
                     ),
                     PageMethod("evaluate", script),
                 ],
-            },
+                playwright_include_page=True,
+            ),
             callback=self.parse_main,
         )
 
     async def parse_main(self, response):
         # ✅ Берём результат последнего PageMethod
-        clicks_done = response.meta["playwright_page_methods"][-1].result
-        self.logger.info(f"✅ Actual 'Показать еще' clicks performed: {clicks_done}")
+        result = response.meta["playwright_page_methods"][-1].result
+        if result is not None:
+            self.logger.info(
+                f"✅ Actual 'Показать еще' clicks performed: {result['clicks']} "
+                f"(stopped: {result['stopReason']})"
+            )
 
-        page = response.meta["playwright_page"]
-        await page.close()
+        # No live page when the response is replayed from a WARC archive
+        page = response.meta.get("playwright_page")
+        if page is not None:
+            await page.close()
 
         # Собираем ссылки на новости
-        news_links = response.css("a[href^='/online/news/']::attr(href)").getall()
+        news_links = self.listing_links(response)
         self.logger.info(f"Found {len(news_links)} news links on the page")
 
+        for request in self.article_requests(response, news_links):
+            yield request
+
+    def listing_links(self, response):
+        """Article paths from a rendered listing page, same format as the feed."""
+        hrefs = response.css("a[href^='/online/news/']::attr(href)").getall()
+        return extract_news_links(" ".join(hrefs))
+
+    def article_requests(self, response, news_links):
+        fetch_mode = getattr(self, "fetch_mode", "playwright")
+        if fetch_mode not in self.FETCH_MODES:
+            raise ValueError(
+                f"fetch_mode must be one of {self.FETCH_MODES}, got {fetch_mode!r}"
+            )
+
         for link in news_links:
             url = response.urljoin(link)
-            yield scrapy.Request(
-                url,
-                callback=self.parse_article,
-                meta={
-                    "playwright": True,
-                    "playwright_page_methods": [PageMethod("wait_for_selector", "h1")],
-                },
+            if self.incremental and self.known_articles.is_known(url):
+                self.crawler.stats.inc_value("news/listing/known_skipped")
+                continue
+            if fetch_mode == "hybrid":
+                yield scrapy.Request(url, callback=self.parse_article_http)
+            else:
+                yield self.playwright_article_request(url)
+
+    # --- listing_mode=feed: page the "Показать еще" endpoint over plain HTTP ---
+
+    def feed_start_requests(self):
+        self.feed_seen = set()
+        template = self.settings.get("NEWS_FEED_URL_TEMPLATE")
+        if template:
+            # Endpoint known in advance: no browser at all
+            self.feed_paginator = FeedPaginator(template=template)
+            self.feed_page_size = None
+            self.logger.info(f"Paging news feed directly: {template}")
+            yield self.feed_request(0)
+            return
+
+        # Endpoint unknown: render the listing once and capture what the button calls
+        self.logger.info("Discovering the 'Показать еще' feed endpoint via Playwright")
+        yield scrapy.Request(
+            self.start_urls[0],
+            meta=self.playwright_meta(
+                [
+                    PageMethod(
+                        "wait_for_selector", self.LOAD_MORE_BUTTON, timeout=60000
+                    ),
+                ],
+                playwright_include_page=True,
+            ),
+            callback=self.parse_feed_discovery,
+        )
+
+    async def parse_feed_discovery(self, response):
+        page = response.meta.get("playwright_page")
+        if page is None:
+            # Replayed from a WARC archive: nothing to click, only the first screen
+            for request in self.article_requests(response, self.listing_links(response)):
+                yield request
+            self.logger.error(
+                "Feed discovery needs a live browser; "
+                "set NEWS_FEED_URL_TEMPLATE to page the feed in WARC replay"
             )
+            return
+        captured = []
+        page.on(
+            "response",
+            lambda r: captured.append(r)
+            if r.request.resource_type in ("xhr", "fetch")
+            else None,
+        )
+        try:
+            await page.click(self.LOAD_MORE_BUTTON)
+            await page.wait_for_load_state(
+                "networkidle",
+                timeout=self.settings.getint("NEWS_LOAD_MORE_TIMEOUT", 10000),
+            )
+        except PlaywrightTimeoutError:
+            self.logger.debug("Feed discovery: network did not go idle, continuing")
+
+        feed_url, feed_body = None, ""
+        for captured_response in captured:
+            try:
+                body = await captured_response.text()
+            except Exception:
+                continue
+            if extract_news_links(body):
+                feed_url, feed_body = captured_response.url, body
+                break
+        await page.close()
+
+        # First screen of the listing, exactly as the click mode sees it
+        listing_links = self.listing_links(response)
+        self.feed_seen.update(response.urljoin(link) for link in listing_links)
+        for request in self.article_requests(response, listing_links):
+            yield request
+
+        if feed_url is None:
+            self.logger.error(
+                "Feed discovery: no XHR/fetch response with news links captured; "
+                "set NEWS_FEED_URL_TEMPLATE or use listing_mode=click"
+            )
+            return
+
+        self.feed_paginator = FeedPaginator(captured_url=feed_url)
+        self.logger.info(f"Feed discovery: captured feed endpoint {feed_url}")
+        links = extract_news_links(feed_body)
+        self.feed_page_size = len(links)
+        for request in self.feed_page_requests(response, links, step=0):
+            yield request
+
+    def feed_request(self, step):
+        return scrapy.Request(
+            self.feed_paginator.url_for(step, self.feed_page_size),
+            callback=self.parse_feed,
+            cb_kwargs={"step": step},
+        )
+
+    def parse_feed(self, response, step):
+        links = extract_news_links(response.text)
+        if step == 0 and self.feed_page_size is None:
+            self.feed_page_size = len(links)
+        for request in self.feed_page_requests(response, links, step):
+            yield request
+
+    def feed_page_requests(self, response, links, step):
+        """Yields article requests for one feed page, then the next page request."""
+        self.crawler.stats.inc_value("news/feed/pages")
+        fresh = [link for link in links if response.urljoin(link) not in self.feed_seen]
+        if not fresh:
+            self.logger.info(f"Feed exhausted after {step + 1} pages")
+            return
+        self.feed_seen.update(response.urljoin(link) for link in fresh)
+        for request in self.article_requests(response, fresh):
+            yield request
+
+        if self.incremental and all(
+            self.known_articles.is_known(response.urljoin(link)) for link in fresh
+        ):
+            self.logger.info(f"Feed caught up with stored articles at page {step + 1}")
+            return
+        max_pages = int(getattr(self, "load_more_clicks", 20))
+        if not self.feed_paginator.usable:
+            self.logger.error(
+                f"Feed URL has no recognizable page/offset parameter: {response.url}; "
+                "set NEWS_FEED_URL_TEMPLATE"
+            )
+        elif step + 1 < max_pages:
+            yield self.feed_request(step + 1)
+
+    def playwright_article_request(self, url, **kwargs):
+        return scrapy.Request(
+            url,
+            callback=self.parse_article,
+            meta=self.playwright_meta([PageMethod("wait_for_selector", "h1")]),
+            **kwargs,
+        )
+
+    def is_server_rendered(self, response):
+        """Checks that the plain HTML already has the body, title and date blocks."""
+        return bool(
+            response.xpath(self.ARTICLE_BODY_XPATH)
+            and response.css("h1")
+            and response.xpath(self.ARTICLE_DATE_XPATH).get()
+        )
+
+    def parse_article_http(self, response):
+        """Hybrid mode: parse plain HTML, fall back to Playwright if incomplete."""
+        if self.is_server_rendered(response):
+            self.crawler.stats.inc_value("news/fetch_path/http")
+            yield from self.parse_article(response)
+            return
+
+        self.logger.debug(f"Falling back to Playwright for {response.url}")
+        self.crawler.stats.inc_value("news/fetch_path/playwright_fallback")
+        yield self.playwright_article_request(response.url, dont_filter=True)
 
     def parse_article(self, response):
         item = NewsScraperItem()
@@ -102,3 +390,10 @@ class NewsSpider(scrapy.Spider):
         ).getall()
         item["source_url"] = response.url
         yield item
+
+    def item_stored(self, item, response, spider):
+        self.known_articles.add(item["source_url"])
+
+    def closed(self, reason):
+        if self.incremental:
+            self.known_articles.save()
@@ -0,0 +1,113 @@
+# project/tests/test_image_downloads.py
+
+"""
+Header photo download concurrency of NewsScraperPipeline.
+
+- A real crawl with the project settings (DOWNLOAD_DELAY = 1,
+  CONCURRENT_REQUESTS_PER_DOMAIN = 1) fetches header photos from a local
+  HTTP server that answers slowly and counts requests in flight.
+- Photos must go through the IMAGE_DOWNLOAD_SLOT slot: several overlap, up
+  to IMAGE_DOWNLOAD_CONCURRENCY_PER_HOST, instead of one per second.
+- The crawl runs in a spawned process, as Twisted reactors can't be restarted.
+"""
+
+import multiprocessing
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+IMAGES = 8
+RESPONSE_DELAY = 0.3
+PER_HOST = 3
+
+
+class SlowImageServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SlowImageHandler)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.first_started = self.last_finished = None
+
+
+class SlowImageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.first_started = server.first_started or time.monotonic()
+        try:
+            time.sleep(RESPONSE_DELAY)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", "4")
+            self.end_headers()
+            self.wfile.write(b"\xff\xd8\xff\xd9")
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+                server.last_finished = time.monotonic()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def crawl_images():
+    """
+    Runs the crawl; returns (max requests in flight, seconds from the first
+    image request to the last response, crawl stats).
+    """
+    import scrapy
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.settings import Settings
+
+    server = SlowImageServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    class PhotoSpider(scrapy.Spider):
+        name = "photos"
+
+        async def start(self):
+            for i in range(IMAGES):
+                yield {"title": f"n{i}", "header_photo_url": f"{base_url}/{i}.jpg"}
+
+    settings = Settings()
+    settings.setmodule("news_scraper.settings", priority="project")
+    settings.setdict(
+        {
+            "DOWNLOAD_HANDLERS": {},  # plain HTTP, no browser
+            "DOWNLOADER_MIDDLEWARES": {},
+            "ITEM_PIPELINES": {"news_scraper.pipelines.NewsScraperPipeline": 300},
+            "HTTPCACHE_ENABLED": False,
+            "IMAGE_DOWNLOAD_CONCURRENCY_PER_HOST": PER_HOST,
+            "LOG_LEVEL": "WARNING",
+            "LOG_INSTALL_ROOT_HANDLER": False,
+        },
+        priority="cmdline",
+    )
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(PhotoSpider)
+    process.crawl(crawler)
+    process.start()
+    server.shutdown()
+    elapsed = server.last_finished - server.first_started
+    return server.max_in_flight, elapsed, crawler.stats.get_stats()
+
+
+def test_header_photos_download_concurrently():
+    context = multiprocessing.get_context("spawn")
+    pool = context.Pool(1)
+    try:
+        max_in_flight, elapsed, stats = pool.apply(crawl_images)
+    finally:
+        # close + join, not terminate: Scrapy's SIGTERM handler keeps the worker alive
+        pool.close()
+        pool.join()
+    assert stats.get("header_photo/downloaded") == IMAGES
+    assert max_in_flight == PER_HOST
+    # One image per DOWNLOAD_DELAY would take IMAGES seconds
+    assert elapsed < IMAGES * RESPONSE_DELAY
@@ -0,0 +1,82 @@
+# project/tests/test_incremental.py
+
+"""
+Incremental mode bookkeeping: when an article counts as known.
+
+- Parsing an article does not mark it known.
+- With MongoDBPipeline enabled, only the articles of batches it actually
+  wrote become known; without it, items that pass all pipelines do.
+"""
+
+from pathlib import Path
+
+from scrapy import signals
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+from twisted.python.failure import Failure
+from pymongo.errors import AutoReconnect
+
+from news_scraper.pipelines import MongoDBPipeline
+from news_scraper.spiders.news_spider import NewsSpider
+
+FIXTURES = Path(__file__).resolve().parents[2] / "benchmarks" / "fixtures"
+ARTICLE_URL = "https://www.kp.ru/online/news/6512345/"
+OTHER_URL = "https://www.kp.ru/online/news/6512344/"
+
+
+def make_spider(tmp_path, pipelines):
+    settings = {
+        "NEWS_KNOWN_URLS_SOURCE": "file",
+        "NEWS_STATE_FILE": str(tmp_path / "news_state.txt"),
+        "ITEM_PIPELINES": pipelines,
+    }
+    crawler = get_crawler(NewsSpider, settings)
+    spider = NewsSpider.from_crawler(crawler, incremental="1")
+    spider.setup_incremental()
+    return spider
+
+
+def test_parsing_an_article_does_not_mark_it_known(tmp_path):
+    spider = make_spider(tmp_path, {})
+    body = (FIXTURES / "kp_article.html").read_bytes()
+    response = HtmlResponse(ARTICLE_URL, body=body, encoding="utf-8")
+    items = list(spider.parse_article(response))
+    assert items[0]["source_url"] == ARTICLE_URL
+    assert not spider.known_articles.is_known(ARTICLE_URL)
+
+
+def test_without_mongodb_scraped_items_become_known(tmp_path):
+    spider = make_spider(tmp_path, {})
+    spider.crawler.signals.send_catch_log(
+        signals.item_scraped,
+        item={"source_url": ARTICLE_URL},
+        response=None,
+        spider=spider,
+    )
+    assert spider.known_articles.is_known(ARTICLE_URL)
+
+
+def test_with_mongodb_only_written_articles_become_known(tmp_path):
+    spider = make_spider(tmp_path, {"news_scraper.pipelines.MongoDBPipeline": 400})
+    # Passing all pipelines is not enough: the write is still buffered
+    spider.crawler.signals.send_catch_log(
+        signals.item_scraped,
+        item={"source_url": ARTICLE_URL},
+        response=None,
+        spider=spider,
+    )
+    assert not spider.known_articles.is_known(ARTICLE_URL)
+
+    pipeline = MongoDBPipeline("mongodb://unused", "news", "articles")
+    pipeline.spider = spider
+    for url, result in [
+        (ARTICLE_URL, ({"nUpserted": 1, "writeErrors": []}, 5.0)),
+        (OTHER_URL, Failure(AutoReconnect("connection lost"))),
+    ]:
+        pipeline.process_item({"source_url": url, "title": "t"}, spider)
+        entries, pipeline.buffer = pipeline.buffer, []
+        pipeline.write_slots.acquire()
+        pipeline.batch_done(result, entries)
+
+    assert spider.known_articles.is_known(ARTICLE_URL)
+    assert not spider.known_articles.is_known(OTHER_URL)
@@ -0,0 +1,79 @@
+# project/tests/test_listing_modes.py
+
+"""
+Parity tests of NewsSpider's two listing modes (listing_mode=click | feed).
+
+- fixtures/kp_listing.html is the rendered /online/ listing after two
+  'Показать еще' clicks (first screen + two loaded batches, plus page chrome
+  and per-card #comments links); fixtures/kp_feed_page<N>.json are the three
+  feed pages behind the button, JSON with escaped slashes as the endpoint
+  sends them.
+- Both paths must request the same article URLs in the same order.
+"""
+
+from pathlib import Path
+
+from scrapy.http import HtmlResponse, TextResponse
+from scrapy.utils.test import get_crawler
+
+from news_scraper.feed import extract_news_links
+from news_scraper.spiders.news_spider import NewsSpider
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+LISTING_URL = "https://www.kp.ru/online/"
+FEED_TEMPLATE = "https://www.kp.ru/content/api/1/pages/get.json?page={page}"
+FEED_PAGES = 3
+
+
+def make_spider():
+    crawler = get_crawler(NewsSpider, {"NEWS_FEED_URL_TEMPLATE": FEED_TEMPLATE})
+    return NewsSpider.from_crawler(crawler, fetch_mode="hybrid")
+
+
+def feed_body(page):
+    path = FIXTURES / f"kp_feed_page{page}.json"
+    return path.read_bytes() if path.exists() else b'{"childs": []}'
+
+
+def listing_response():
+    body = (FIXTURES / "kp_listing.html").read_bytes()
+    return HtmlResponse(LISTING_URL, body=body, encoding="utf-8")
+
+
+def click_mode_urls(spider):
+    response = listing_response()
+    requests = spider.article_requests(response, spider.listing_links(response))
+    return [request.url for request in requests]
+
+
+def feed_mode_urls(spider):
+    """Runs the feed path offline, answering each feed request from the fixtures."""
+    urls = []
+    pending = list(spider.feed_start_requests())
+    while pending:
+        request = pending.pop(0)
+        if request.callback != spider.parse_feed:
+            urls.append(request.url)
+            continue
+        page = request.cb_kwargs["step"] + 1
+        response = TextResponse(
+            request.url, body=feed_body(page), encoding="utf-8", request=request
+        )
+        pending.extend(request.callback(response, **request.cb_kwargs))
+    return urls
+
+
+def test_feed_and_dom_listing_extract_the_same_links():
+    dom_links = make_spider().listing_links(listing_response())
+    feed_links = []
+    for page in range(1, FEED_PAGES + 1):
+        feed_links += extract_news_links(feed_body(page).decode("utf-8"))
+    assert len(dom_links) == 30
+    assert dom_links == feed_links
+
+
+def test_click_and_feed_modes_request_the_same_articles():
+    urls = click_mode_urls(make_spider())
+    assert urls[0] == "https://www.kp.ru/online/news/6512345/"
+    assert len(set(urls)) == 30
+    assert feed_mode_urls(make_spider()) == urls
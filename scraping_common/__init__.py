@@ -0,0 +1,14 @@
+# scraping_common/__init__.py
+
+"""
+Code shared by the merchant_scraper, book_scraper and news_scraper projects.
+
+- Referenced from ITEM_PIPELINES / DOWNLOADER_MIDDLEWARES / HTTPCACHE_* or
+  imported from project code as `scraping_common.<module>`.
+- Not an installed package: the repository root must be on PYTHONPATH when
+  running any of the crawls (scrapy crawl, hw2/run_shards.py),
+  e.g. from hw2/:
+      PYTHONPATH=.. scrapy crawl chitai_gorod_sitemap
+  or once per shell, from the repository root:
+      export PYTHONPATH="$PWD"
+"""
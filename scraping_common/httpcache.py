@@ -0,0 +1,345 @@
+# scraping_common/httpcache.py
+
+"""
+Conditional-request HTTP cache for repeat crawls, shared by all three projects.
+
+- CompressedCacheStorage (HTTPCACHE_STORAGE): one SQLite file per spider in
+  HTTPCACHE_DIR holding status, headers and the body of every cached
+  response. Bodies are compressed with zstd (zlib if the zstandard package
+  is not installed); gzip/deflate bodies are decoded first, so zstd gets the
+  plain HTML instead of already compressed bytes.
+- Size-based eviction: when the compressed bodies exceed HTTPCACHE_MAX_SIZE
+  bytes, least recently used entries are dropped down to 90% of it.
+- ConditionalCachePolicy (HTTPCACHE_POLICY): RFC2616Policy that never caches
+  Playwright requests (rendered DOM, nothing to revalidate) and, with
+  HTTPCACHE_ALWAYS_REVALIDATE, revalidates every cached page that has an
+  ETag/Last-Modified with If-None-Match/If-Modified-Since instead of trusting
+  heuristic freshness. A 304 is answered from the cache.
+- ConditionalHttpCacheMiddleware: Scrapy's HttpCacheMiddleware plus stats:
+  httpcache/not_modified (304s), httpcache/bytes_saved (wire size of bodies
+  not downloaded because of a fresh hit or a 304) and httpcache/hit_ratio
+  (responses served from the cache / all cacheable responses).
+- The cache is switched off whenever WARC_MODE is not "off", so a recorded
+  archive always holds full bodies and replay never sees a 304.
+"""
+
+import gzip
+import logging
+import os
+import sqlite3
+import time
+import zlib
+
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.exceptions import NotConfigured
+from scrapy.extensions.httpcache import RFC2616Policy
+from scrapy.http import Headers, Response
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+try:
+    import zstandard
+except ImportError:  # fall back to zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers BLOB NOT NULL,
+    body BLOB NOT NULL,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    wire_size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+
+
+class BodyCodec:
+    """zstd if available, zlib otherwise; each entry records which one it used."""
+
+    def __init__(self):
+        if zstandard is not None:
+            self.name = "zstd"
+            self.compressor = zstandard.ZstdCompressor(level=3)
+            self.decompressor = zstandard.ZstdDecompressor()
+        else:
+            self.name = "zlib"
+
+    def compress(self, data):
+        if self.name == "zstd":
+            return self.compressor.compress(data)
+        return zlib.compress(data, 6)
+
+    def decompress(self, data, codec):
+        if codec == "zstd":
+            if zstandard is None:
+                return None  # written by a process that had zstandard
+            return self.decompressor.decompress(data)
+        return zlib.decompress(data)
+
+
+def decode_content(headers, body):
+    """Undoes gzip/deflate Content-Encoding; returns (headers, body)."""
+    encoding = (headers.get(b"Content-Encoding") or b"").lower()
+    try:
+        if encoding in (b"gzip", b"x-gzip"):
+            body = gzip.decompress(body)
+        elif encoding == b"deflate":
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                body = zlib.decompress(body, -zlib.MAX_WBITS)  # raw deflate
+        else:
+            return headers, body
+    except (OSError, EOFError, zlib.error):
+        return headers, body  # leave broken bodies to HttpCompressionMiddleware
+    headers = Headers(headers)
+    headers.pop(b"Content-Encoding", None)
+    headers.pop(b"Content-Length", None)
+    return headers, body
+
+
+class CompressedCacheStorage:
+    def __init__(self, settings):
+        self.cachedir = data_path(settings["HTTPCACHE_DIR"])
+        self.expiration_secs = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+        self.max_size = settings.getint("HTTPCACHE_MAX_SIZE", 2 * 1024**3)
+        self.flush_every = 100
+        self.codec = BodyCodec()
+        self.connection = None
+        self.total_size = 0
+        self.stores = 0
+        self.touched = {}  # key -> last access time, written in batches
+
+    def open_spider(self, spider):
+        os.makedirs(self.cachedir, exist_ok=True)
+        path = os.path.join(self.cachedir, f"{spider.name}.sqlite3")
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(SCHEMA)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self.connection.commit()
+        self.total_size = self.read_total_size()
+        self.fingerprinter = spider.crawler.request_fingerprinter
+        self.stats = spider.crawler.stats
+        spider.logger.info(
+            f"HTTP cache: {path} ({self.total_size} bytes, {self.codec.name} bodies)"
+        )
+
+    def close_spider(self, spider):
+        if self.connection is not None:
+            self.flush_touched()
+            self.connection.close()
+            self.connection = None
+
+    def key(self, request):
+        return self.fingerprinter.fingerprint(request).hex()
+
+    def read_total_size(self):
+        return self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def write(self, statements):
+        """
+        Runs (sql, params) statements in one short transaction. Shard processes
+        share the file, so no transaction is left open between calls; a write
+        that still can't get the lock is counted and skipped (the response
+        itself is passed on uncached).
+        """
+        try:
+            with self.connection:  # commits, or rolls back on error
+                for sql, params in statements:
+                    if isinstance(params, list):
+                        self.connection.executemany(sql, params)
+                    else:
+                        self.connection.execute(sql, params)
+        except sqlite3.OperationalError as e:
+            self.stats.inc_value("httpcache/store_error")
+            logger.warning(f"HTTP cache write skipped: {e}")
+            return False
+        return True
+
+    def flush_touched(self):
+        if self.touched:
+            rows = [(accessed_at, key) for key, accessed_at in self.touched.items()]
+            self.touched = {}
+            self.write([("UPDATE responses SET accessed_at = ? WHERE key = ?", rows)])
+
+    def retrieve_response(self, spider, request):
+        """Return response if present in cache, or None otherwise."""
+        key = self.key(request)
+        row = self.connection.execute(
+            "SELECT url, status, headers, body, codec, wire_size, stored_at "
+            "FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        url, status, raw_headers, data, codec, wire_size, stored_at = row
+        if 0 < self.expiration_secs < time.time() - stored_at:
+            return None  # expired
+        body = self.codec.decompress(data, codec)
+        if body is None:
+            return None
+        # LRU bookkeeping only: batched, so reads don't take the write lock
+        self.touched[key] = time.time()
+        if len(self.touched) >= self.flush_every:
+            self.flush_touched()
+        headers = Headers(headers_raw_to_dict(raw_headers))
+        request.meta["cache_timestamp"] = stored_at
+        request.meta["cache_wire_size"] = wire_size
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, status=status, headers=headers, body=body)
+
+    def store_response(self, spider, request, response):
+        """Store the given response in the cache."""
+        key = self.key(request)
+        now = time.time()
+        raw_headers = headers_dict_to_raw(response.headers)
+        self.touched.pop(key, None)
+        if "cached" in response.flags:
+            # Freshened after a 304: the body is unchanged, only update headers
+            self.write(
+                [
+                    (
+                        "UPDATE responses SET headers = ?, stored_at = ?, "
+                        "accessed_at = ? WHERE key = ?",
+                        (raw_headers, now, now, key),
+                    )
+                ]
+            )
+            return
+        headers, body = decode_content(response.headers, response.body)
+        data = self.codec.compress(body)
+        previous = self.connection.execute(
+            "SELECT size FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        stored = self.write(
+            [
+                (
+                    "INSERT OR REPLACE INTO responses (key, url, status, headers, "
+                    "body, codec, size, wire_size, stored_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        response.url,
+                        response.status,
+                        headers_dict_to_raw(headers),
+                        data,
+                        self.codec.name,
+                        len(data),
+                        len(response.body),
+                        now,
+                        now,
+                    ),
+                )
+            ]
+        )
+        if not stored:
+            return
+        self.total_size += len(data) - (previous[0] if previous else 0)
+        self.stores += 1
+        if self.stores % self.flush_every == 0:
+            # Other shard processes write to the same file too
+            self.total_size = self.read_total_size()
+        if self.max_size and self.total_size > self.max_size:
+            self.evict(spider)
+
+    def evict(self, spider):
+        """Drops least recently used entries until the cache is at 90% of max size."""
+        self.flush_touched()
+        self.total_size = self.read_total_size()
+        if self.total_size <= self.max_size:
+            return
+        target = self.max_size * 0.9
+        victims = []
+        rows = self.connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        )
+        for key, size in rows:
+            if self.total_size <= target:
+                break
+            victims.append((key,))
+            self.total_size -= size
+        rows.close()
+        if self.write([("DELETE FROM responses WHERE key = ?", victims)]):
+            self.stats.inc_value("httpcache/evicted", len(victims))
+        else:
+            self.total_size = self.read_total_size()
+
+
+class ConditionalCachePolicy(RFC2616Policy):
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.always_revalidate = settings.getbool("HTTPCACHE_ALWAYS_REVALIDATE", True)
+
+    def should_cache_request(self, request):
+        if request.meta.get("playwright"):
+            return False
+        return super().should_cache_request(request)
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        headers = cachedresponse.headers
+        if self.always_revalidate and (b"ETag" in headers or b"Last-Modified" in headers):
+            self._set_conditional_validators(request, cachedresponse)
+            return False
+        return super().is_cached_response_fresh(cachedresponse, request)
+
+
+class ConditionalHttpCacheMiddleware(HttpCacheMiddleware):
+    """
+    HttpCacheMiddleware that also counts 304s, bytes saved and the hit ratio.
+    Disabled while WARC_MODE is "record" or "replay": cache hits would never
+    reach the WARC recorder and 304s would be archived without bodies.
+    """
+
+    def __init__(self, settings, stats):
+        warc_mode = settings.get("WARC_MODE", "off") or "off"
+        if warc_mode != "off":
+            raise NotConfigured(f"HTTP cache is off while WARC_MODE={warc_mode}")
+        super().__init__(settings, stats)
+
+    def process_request(self, request, spider=None):
+        result = super().process_request(request)
+        if isinstance(result, Response):  # fresh hit, no request sent at all
+            self.stats.inc_value(
+                "httpcache/bytes_saved", request.meta.get("cache_wire_size", 0)
+            )
+        return result
+
+    def process_response(self, request, response, spider=None):
+        cachedresponse = request.meta.get("cached_response")
+        result = super().process_response(request, response)
+        if cachedresponse is not None and result is cachedresponse:
+            if response.status == 304:
+                self.stats.inc_value("httpcache/not_modified")
+                self.stats.inc_value(
+                    "httpcache/bytes_saved", request.meta.get("cache_wire_size", 0)
+                )
+        return result
+
+    def spider_closed(self, spider):
+        super().spider_closed(spider)
+        served = self.stats.get_value("httpcache/hit", 0) + self.stats.get_value(
+            "httpcache/not_modified", 0
+        )
+        downloaded = self.stats.get_value("httpcache/firsthand", 0) + self.stats.get_value(
+            "httpcache/invalidate", 0
+        )
+        if served + downloaded:
+            ratio = round(served / (served + downloaded), 4)
+            self.stats.set_value("httpcache/hit_ratio", ratio)
+            spider.logger.info(
+                f"HTTP cache: hit ratio {ratio:.1%}, "
+                f"{self.stats.get_value('httpcache/bytes_saved', 0)} bytes not downloaded"
+            )
@@ -0,0 +1,360 @@
+# scraping_common/mongo.py
+
+"""
+Shared MongoDB storage pipeline for book_scraper and news_scraper.
+
+- Items are upserted by a key field (KEY_FIELD, set by each project).
+- Upserts are buffered as UpdateOne operations and written with an
+  unordered bulk_write when the buffer reaches MONGODB_BATCH_SIZE, when
+  MONGODB_FLUSH_INTERVAL seconds have passed, and on close_spider.
+- Failed operations of a batch are logged one by one with their key.
+- Writes run on a dedicated thread pool, never on the reactor thread. At most
+  MONGODB_MAX_PENDING_BATCHES batches are queued or in flight; only when all
+  of them are busy does process_item hold the item back (backpressure).
+- Queue depth and write latency are exposed as crawl stats (mongodb/*);
+  mongodb/batches and the latency average cover the batches the server
+  answered, batches lost to connection errors are counted in
+  mongodb/batches_failed.
+- Required indexes (INDEXES, set by each project) are created idempotently on
+  open_spider; any index that could not be created is logged.
+- Every document stores a fingerprint of its content. Items whose fingerprint
+  matches the stored one (preloaded on open_spider, then updated from the
+  batches written successfully) are not written at all. Stats count inserted,
+  updated and unchanged items.
+- Every document carries updated_at: the time its content last changed
+  (kept as is when a write does not change the fingerprint).
+"""
+
+import hashlib
+import json
+import time
+
+import pymongo
+from itemadapter import ItemAdapter
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from twisted.internet import defer, reactor, task
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.failure import Failure
+from twisted.python.threadpool import ThreadPool
+
+
+def ensure_indexes(collection, indexes, logger):
+    """
+    Creates the given IndexModels (a no-op for indexes that already exist)
+    and logs every index that is still missing afterwards.
+    Returns the names of the missing indexes.
+    """
+    for index in indexes:
+        try:
+            collection.create_indexes([index])
+        except OperationFailure as e:
+            logger.error(
+                f"[MongoDB] Can't create index {index.document['name']} "
+                f"on {collection.name}: {e}"
+            )
+    return check_indexes(collection, indexes, logger)
+
+
+def check_indexes(collection, indexes, logger):
+    """Logs and returns the names of required indexes missing on a collection."""
+    existing = collection.index_information()
+    missing = [
+        index.document["name"]
+        for index in indexes
+        if index.document["name"] not in existing
+    ]
+    for name in missing:
+        logger.warning(f"[MongoDB] Missing index {name} on {collection.name}")
+    return missing
+
+
+def item_fingerprint(data, exclude=()):
+    """Stable SHA-1 of an item's normalized content (key order independent)."""
+    content = {k: v for k, v in data.items() if k not in exclude}
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class MongoDBPipeline:
+    """Base pipeline: buffered bulk upserts of items keyed by KEY_FIELD."""
+
+    KEY_FIELD = None
+    DEFAULT_DATABASE = None
+    DEFAULT_COLLECTION = None
+    INDEXES = []
+    FINGERPRINT_FIELD = "content_fingerprint"
+    UPDATED_AT_FIELD = "updated_at"
+
+    def __init__(
+        self,
+        mongodb_uri,
+        mongodb_db,
+        mongodb_collection,
+        batch_size=100,
+        flush_interval=5.0,
+        writer_threads=2,
+        max_pending_batches=4,
+        create_indexes=True,
+        preload_fingerprints=True,
+        stats=None,
+    ):
+        self.mongodb_uri = mongodb_uri
+        self.mongodb_db = mongodb_db
+        self.mongodb_collection = mongodb_collection
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.writer_threads = max(1, writer_threads)
+        self.create_indexes = create_indexes
+        self.preload_fingerprints = preload_fingerprints
+        self.fingerprints = {}  # key -> content fingerprint already in the DB
+        self.unwritten = {}  # key -> operations buffered or in flight for it
+        self.stats = stats
+        self.buffer = []  # (UpdateOne, key, fingerprint)
+        self.last_flush = time.monotonic()
+        self.flush_loop = None
+        self.write_slots = defer.DeferredSemaphore(max(1, max_pending_batches))
+        self.pending = set()
+        self.queued_ops = 0  # operations handed to flush() but not yet written
+        self.latency_total_ms = 0.0  # over the successfully written batches
+        self.batches_written = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            mongodb_uri=settings.get("MONGODB_URI", "mongodb://localhost:27017"),
+            mongodb_db=settings.get("MONGODB_DATABASE", cls.DEFAULT_DATABASE),
+            mongodb_collection=settings.get(
+                "MONGODB_COLLECTION", cls.DEFAULT_COLLECTION
+            ),
+            batch_size=settings.getint("MONGODB_BATCH_SIZE", 100),
+            flush_interval=settings.getfloat("MONGODB_FLUSH_INTERVAL", 5.0),
+            writer_threads=settings.getint("MONGODB_WRITER_THREADS", 2),
+            max_pending_batches=settings.getint("MONGODB_MAX_PENDING_BATCHES", 4),
+            create_indexes=settings.getbool("MONGODB_ENSURE_INDEXES", True),
+            preload_fingerprints=settings.getbool(
+                "MONGODB_PRELOAD_FINGERPRINTS", True
+            ),
+            stats=crawler.stats,
+        )
+
+    def open_spider(self, spider):
+        spider.logger.info("[MongoDBPipeline] Connecting to MongoDB...")
+        self.spider = spider
+        self.client = pymongo.MongoClient(
+            self.mongodb_uri, maxPoolSize=self.writer_threads
+        )
+        self.db = self.client[self.mongodb_db]
+        self.collection = self.db[self.mongodb_collection]
+        if self.INDEXES:
+            if self.create_indexes:
+                ensure_indexes(self.collection, self.INDEXES, spider.logger)
+            else:
+                check_indexes(self.collection, self.INDEXES, spider.logger)
+        if self.preload_fingerprints:
+            projection = {self.KEY_FIELD: 1, self.FINGERPRINT_FIELD: 1, "_id": 0}
+            for doc in self.collection.find(
+                {self.FINGERPRINT_FIELD: {"$exists": True}}, projection
+            ):
+                key = doc.get(self.KEY_FIELD)
+                self.fingerprints[key] = doc[self.FINGERPRINT_FIELD]
+            spider.logger.info(
+                f"[MongoDBPipeline] Preloaded {len(self.fingerprints)} fingerprints"
+            )
+        self.threadpool = ThreadPool(
+            minthreads=1, maxthreads=self.writer_threads, name="mongodb-writer"
+        )
+        self.threadpool.start()
+        if self.flush_interval > 0:
+            # Time-based flush, so a slow trickle of items is not held back
+            self.flush_loop = task.LoopingCall(self.flush_if_due)
+            self.flush_loop.start(self.flush_interval, now=False)
+
+    @defer.inlineCallbacks
+    def close_spider(self, spider):
+        if self.flush_loop is not None and self.flush_loop.running:
+            self.flush_loop.stop()
+        yield self.flush()
+        yield defer.DeferredList(list(self.pending))
+        self.threadpool.stop()
+        if self.batches_written:
+            self.set_stat(
+                "mongodb/write_latency_ms_avg",
+                round(self.latency_total_ms / self.batches_written, 1),
+            )
+        spider.logger.info("[MongoDBPipeline] Closing MongoDB connection.")
+        self.client.close()
+
+    def log_item(self, data, spider):
+        """Hook for projects to log each saved item their own way."""
+
+    def items_stored(self, keys, spider):
+        """Hook for projects: KEY_FIELD values of the items a batch wrote."""
+
+    def process_item(self, item, spider):
+        data = ItemAdapter(item).asdict()
+        key = data.get(self.KEY_FIELD)
+        fingerprint = item_fingerprint(data, exclude=(self.FINGERPRINT_FIELD,))
+        if key not in self.unwritten and self.fingerprints.get(key) == fingerprint:
+            # Same content as the stored document: skip the write entirely
+            self.inc_stat("mongodb/items_unchanged")
+            return item
+        data[self.FINGERPRINT_FIELD] = fingerprint
+
+        self.log_item(data, spider)
+        operation = UpdateOne(
+            {self.KEY_FIELD: key}, self.upsert_pipeline(data), upsert=True
+        )
+        # The fingerprint is recorded only once the write succeeded (batch_done)
+        self.unwritten[key] = self.unwritten.get(key, 0) + 1
+        self.buffer.append((operation, key, fingerprint))
+        if len(self.buffer) >= self.batch_size:
+            # Fires at once if a write slot is free, otherwise holds the item back
+            return self.flush().addCallback(lambda _: item)
+        return item
+
+    def upsert_pipeline(self, data):
+        """
+        Update pipeline that sets the item fields and bumps updated_at only if
+        the stored fingerprint differs (all expressions see the old document).
+        """
+        fields = {field: {"$literal": value} for field, value in data.items()}
+        fields[self.UPDATED_AT_FIELD] = {
+            "$cond": [
+                {"$eq": [f"${self.FINGERPRINT_FIELD}", data[self.FINGERPRINT_FIELD]]},
+                f"${self.UPDATED_AT_FIELD}",
+                "$$NOW",
+            ]
+        }
+        return [{"$set": fields}]
+
+    def flush_if_due(self):
+        if self.buffer and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush().addErrback(
+                lambda f: self.spider.logger.error(
+                    f"[MongoDBPipeline] Scheduled flush failed: {f.value}"
+                )
+            )
+
+    def flush(self):
+        """
+        Hands all buffered operations to the writer thread pool as one batch.
+        Returns a Deferred that fires once the batch has a write slot.
+        """
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return defer.succeed(None)
+        entries, self.buffer = self.buffer, []
+        operations = [operation for operation, _, _ in entries]
+        self.queued_ops += len(operations)
+        self.set_stat("mongodb/queue_depth", self.queued_ops)
+        self.max_stat("mongodb/queue_depth_max", self.queued_ops)
+        if not self.write_slots.tokens:
+            self.inc_stat("mongodb/backpressure_waits")
+
+        # Fires when the batch is written; close_spider waits for all of them
+        done = defer.Deferred()
+        self.pending.add(done)
+        done.addBoth(lambda _: self.pending.discard(done))
+
+        def start_write(_):
+            write = deferToThreadPool(
+                reactor, self.threadpool, self.write_batch, operations
+            )
+            write.addBoth(self.batch_done, entries)
+            write.chainDeferred(done)
+
+        return self.write_slots.acquire().addCallback(start_write)
+
+    def write_batch(self, operations):
+        """Runs in a writer thread: one unordered bulk_write, timed."""
+        started = time.monotonic()
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            details = {
+                "nUpserted": result.upserted_count,
+                "nMatched": result.matched_count,
+                "nModified": result.modified_count,
+                "writeErrors": [],
+            }
+        except BulkWriteError as e:
+            details = e.details
+        return details, (time.monotonic() - started) * 1000
+
+    def batch_done(self, result, entries):
+        """Back on the reactor thread: release the slot and record stats."""
+        self.write_slots.release()
+        operations = [operation for operation, _, _ in entries]
+        for _, key, _ in entries:
+            self.unwritten[key] -= 1
+            if not self.unwritten[key]:
+                del self.unwritten[key]
+        self.queued_ops -= len(operations)
+        self.set_stat("mongodb/queue_depth", self.queued_ops)
+
+        if isinstance(result, Failure):
+            # Connection-level failure: the whole batch was not written
+            self.inc_stat("mongodb/batches_failed")
+            self.inc_stat("mongodb/items_failed", len(operations))
+            self.spider.logger.error(
+                f"[MongoDBPipeline] Bulk write of {len(operations)} operations "
+                f"failed: {result.value!r}"
+            )
+            return None
+
+        details, latency_ms = result
+        self.inc_stat("mongodb/batches")
+        self.batches_written += 1
+        self.latency_total_ms += latency_ms
+        self.set_stat("mongodb/write_latency_ms", round(latency_ms, 1))
+        self.max_stat("mongodb/write_latency_ms_max", round(latency_ms, 1))
+        if details["writeErrors"]:
+            # Unordered: everything except the listed operations was written
+            self.log_bulk_errors(operations, details)
+            self.inc_stat("mongodb/items_failed", len(details["writeErrors"]))
+        failed = {error.get("index") for error in details["writeErrors"]}
+        stored = []
+        for index, (_, key, fingerprint) in enumerate(entries):
+            if index not in failed:
+                self.fingerprints[key] = fingerprint
+                stored.append(key)
+        self.items_stored(stored, self.spider)
+        inserted = details.get("nUpserted", 0)
+        updated = details.get("nModified", 0)
+        # Matched but not modified: $set with identical values (no preload hit)
+        unchanged = details.get("nMatched", 0) - updated
+        self.inc_stat("mongodb/items_inserted", inserted)
+        self.inc_stat("mongodb/items_updated", updated)
+        self.inc_stat("mongodb/items_unchanged", unchanged)
+        self.spider.logger.debug(
+            f"[MongoDBPipeline] Flushed {len(operations)} operations in "
+            f"{latency_ms:.0f} ms: {inserted} inserted, {updated} updated, "
+            f"{unchanged} unchanged"
+        )
+        return None
+
+    def log_bulk_errors(self, operations, details):
+        errors = details.get("writeErrors", [])
+        self.spider.logger.error(
+            f"[MongoDBPipeline] Bulk write: {len(errors)} of {len(operations)} "
+            "operations failed"
+        )
+        for error in errors:
+            key = error.get("op", {}).get("q", {}).get(self.KEY_FIELD)
+            self.spider.logger.error(
+                f"[MongoDBPipeline]   #{error.get('index')} {self.KEY_FIELD}={key!r}: "
+                f"code {error.get('code')}: {error.get('errmsg')}"
+            )
+
+    def inc_stat(self, key, count=1):
+        if self.stats is not None:
+            self.stats.inc_value(key, count)
+
+    def set_stat(self, key, value):
+        if self.stats is not None:
+            self.stats.set_value(key, value)
+
+    def max_stat(self, key, value):
+        if self.stats is not None:
+            self.stats.max_value(key, value)
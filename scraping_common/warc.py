@@ -0,0 +1,296 @@
+# scraping_common/warc.py
+
+"""
+WARC record/replay of downloaded responses, shared by all three projects.
+
+- WARC_MODE = "record": every response coming back from the download
+  handler is appended to gzip-compressed WARC/1.1 files in WARC_DIR
+  (one gzip member per record, so standard WARC tools can read them).
+  Files are rotated at WARC_MAX_FILE_SIZE bytes.
+- Next to each <name>.warc.gz an <name>.warc.gz.idx index is written
+  (request key, offset, length, URL per line), so replay can seek straight
+  to a record instead of decompressing whole archives.
+- WARC_MODE = "replay": requests are answered from the archives and never
+  reach the network (or the download delay); a request with no recorded
+  response is dropped with IgnoreRequest and counted in warc/replay/missing.
+- Requests are matched by Scrapy's request fingerprint plus whether they
+  were rendered by Playwright, so a plain HTTP fetch and a Playwright
+  fetch of the same URL are kept apart.
+- The middleware sits right next to the downloader (order ~950): redirects,
+  decompression and retries run on replayed responses exactly as they did
+  on the recorded ones.
+
+Run a crawl with -s WARC_MODE=record once, then re-parse it offline with
+-s WARC_MODE=replay (same WARC_DIR).
+"""
+
+import glob
+import gzip
+import os
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from twisted.web.http import RESPONSES
+
+WARC_MODES = ("off", "record", "replay")
+KEY_HEADER = "WARC-Scrapy-Request-Key"
+FLAGS_HEADER = "WARC-Scrapy-Flags"
+
+
+def request_key(crawler, request):
+    """Replay lookup key of a request: fingerprint (+ ":playwright")."""
+    key = crawler.request_fingerprinter.fingerprint(request).hex()
+    if request.meta.get("playwright"):
+        key += ":playwright"
+    return key
+
+
+def warc_record(headers, block):
+    lines = [b"WARC/1.1"]
+    for name, value in headers:
+        lines.append(f"{name}: {value}".encode("utf-8"))
+    lines.append(f"Content-Length: {len(block)}".encode())
+    return b"\r\n".join(lines) + b"\r\n\r\n" + block + b"\r\n\r\n"
+
+
+def http_response_block(response):
+    reason = RESPONSES.get(response.status, b"").decode("latin-1")
+    protocol = response.protocol or "HTTP/1.1"
+    lines = [f"{protocol} {response.status} {reason}".encode("latin-1")]
+    for name, values in response.headers.items():
+        for value in values:
+            lines.append(name + b": " + value)
+    return b"\r\n".join(lines) + b"\r\n\r\n" + response.body
+
+
+def parse_record(data):
+    """Decompressed WARC record -> (WARC headers dict, content block)."""
+    head, _, rest = data.partition(b"\r\n\r\n")
+    headers = {}
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.decode("utf-8").partition(":")
+        headers[name.strip()] = value.strip()
+    length = int(headers.get("Content-Length", len(rest)))
+    return headers, rest[:length]
+
+
+def parse_http_response(block):
+    """HTTP response block -> (status, Headers, body)."""
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.split(b"\r\n")
+    status = int(lines[0].split(b" ", 2)[1])
+    headers = Headers()
+    for line in lines[1:]:
+        name, _, value = line.partition(b":")
+        headers.appendlist(name.strip(), value.strip())
+    return status, headers, body
+
+
+class WarcWriter:
+    """Appends response records to rotating .warc.gz files plus their .idx files."""
+
+    def __init__(self, directory, prefix, max_file_size):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_file_size = max_file_size
+        self.serial = 0
+        self.started = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        self.file = self.index = None
+        self.path = None
+
+    def open_next(self):
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(
+            self.directory, f"{self.prefix}-{self.started}-{self.serial:05d}.warc.gz"
+        )
+        self.serial += 1
+        self.file = open(self.path, "ab")
+        # Line-buffered, so the index survives a killed crawl along with the archive
+        self.index = open(self.path + ".idx", "a", encoding="utf-8", buffering=1)
+        info = b"software: Scrapy\r\nformat: WARC File Format 1.1\r\n"
+        self.append(
+            warc_record(
+                [
+                    ("WARC-Type", "warcinfo"),
+                    ("WARC-Record-ID", f"<urn:uuid:{uuid.uuid4()}>"),
+                    ("WARC-Date", self.now()),
+                    ("WARC-Filename", os.path.basename(self.path)),
+                    ("Content-Type", "application/warc-fields"),
+                ],
+                info,
+            )
+        )
+
+    @staticmethod
+    def now():
+        return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def append(self, record):
+        offset = self.file.tell()
+        self.file.write(gzip.compress(record, compresslevel=6))
+        return offset, self.file.tell() - offset
+
+    def write_response(self, key, response):
+        """Writes one response record and returns its compressed size."""
+        if self.file is None or self.file.tell() >= self.max_file_size:
+            self.open_next()
+        headers = [
+            ("WARC-Type", "response"),
+            ("WARC-Record-ID", f"<urn:uuid:{uuid.uuid4()}>"),
+            ("WARC-Date", self.now()),
+            ("WARC-Target-URI", response.url),
+            ("Content-Type", "application/http;msgtype=response"),
+            (KEY_HEADER, key),
+        ]
+        if response.flags:
+            headers.append((FLAGS_HEADER, " ".join(response.flags)))
+        if response.ip_address is not None:
+            headers.append(("WARC-IP-Address", str(response.ip_address)))
+        record = warc_record(headers, http_response_block(response))
+        offset, length = self.append(record)
+        self.index.write(f"{key}\t{offset}\t{length}\t{response.url}\n")
+        return length
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.index.close()
+            self.file = self.index = None
+
+
+class WarcArchive:
+    """Read side: request key -> (path, offset, length) over all archives in a directory."""
+
+    def __init__(self, directory, prefix):
+        self.directory = directory
+        self.prefix = prefix
+        self.records = {}
+
+    def load(self):
+        pattern = os.path.join(self.directory, f"{self.prefix}-*.warc.gz")
+        for path in sorted(glob.glob(pattern)):
+            if os.path.exists(path + ".idx"):
+                self.load_index(path)
+            else:
+                self.scan(path)
+        return self
+
+    def __len__(self):
+        return len(self.records)
+
+    def load_index(self, path):
+        size = os.path.getsize(path)
+        with open(path + ".idx", encoding="utf-8") as f:
+            for line in f:
+                key, offset, length, _ = line.rstrip("\n").split("\t", 3)
+                offset, length = int(offset), int(length)
+                if offset + length <= size:  # skip records cut off by a crash
+                    self.records[key] = (path, offset, length)
+
+    def scan(self, path):
+        """Indexes an archive without .idx by walking its gzip members."""
+        offset = 0
+        with open(path, "rb") as f:
+            while True:
+                f.seek(offset)
+                decompressor = zlib.decompressobj(wbits=31)
+                parts = []
+                try:
+                    while not decompressor.eof:
+                        chunk = f.read(1 << 16)
+                        if not chunk:
+                            return  # end of file, or a record cut off by a crash
+                        parts.append(decompressor.decompress(chunk))
+                except zlib.error:
+                    return
+                length = f.tell() - offset - len(decompressor.unused_data)
+                headers, _ = parse_record(b"".join(parts))
+                if headers.get("WARC-Type") == "response" and KEY_HEADER in headers:
+                    self.records[headers[KEY_HEADER]] = (path, offset, length)
+                offset += length
+
+    def read(self, key):
+        """Returns (WARC headers, HTTP block) of the recorded response, or None."""
+        location = self.records.get(key)
+        if location is None:
+            return None
+        path, offset, length = location
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        return parse_record(gzip.decompress(data))
+
+
+class WarcMiddleware:
+    """
+    Downloader middleware base for record/replay; each project's
+    *DownloaderMiddleware subclasses it (off unless WARC_MODE is set).
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.mode = crawler.settings.get("WARC_MODE", "off") or "off"
+        if self.mode not in WARC_MODES:
+            raise ValueError(f"WARC_MODE must be one of {WARC_MODES}, got {self.mode!r}")
+        self.directory = crawler.settings.get("WARC_DIR", "warc")
+        self.max_file_size = crawler.settings.getint("WARC_MAX_FILE_SIZE", 1024**3)
+        self.writer = None
+        self.archive = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = cls(crawler)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def spider_opened(self, spider):
+        if self.mode == "record":
+            self.writer = WarcWriter(self.directory, spider.name, self.max_file_size)
+            spider.logger.info(f"Recording responses to WARC files in {self.directory}")
+        elif self.mode == "replay":
+            self.archive = WarcArchive(self.directory, spider.name).load()
+            spider.logger.info(
+                f"Replaying {len(self.archive)} recorded responses from {self.directory}"
+            )
+
+    def spider_closed(self, spider):
+        if self.writer is not None:
+            self.writer.close()
+
+    def process_request(self, request, spider):
+        if self.archive is None:
+            return None
+        recorded = self.archive.read(request_key(self.crawler, request))
+        if recorded is None:
+            self.stats.inc_value("warc/replay/missing")
+            spider.logger.warning(f"Not in the WARC archive, skipped: {request.url}")
+            raise IgnoreRequest(f"No recorded response for {request.url}")
+        headers, block = recorded
+        status, http_headers, body = parse_http_response(block)
+        url = headers.get("WARC-Target-URI", request.url)
+        flags = headers.get(FLAGS_HEADER, "").split() + ["warc"]
+        respcls = responsetypes.from_args(headers=http_headers, url=url, body=body)
+        self.stats.inc_value("warc/replay/responses")
+        return respcls(
+            url=url,
+            status=status,
+            headers=http_headers,
+            body=body,
+            flags=flags,
+            request=request,
+        )
+
+    def process_response(self, request, response, spider):
+        if self.writer is not None and "warc" not in response.flags:
+            size = self.writer.write_response(request_key(self.crawler, request), response)
+            self.stats.inc_value("warc/record/responses")
+            self.stats.inc_value("warc/record/bytes", size)
+        return response